@@ -0,0 +1,185 @@
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+ANSWER_CACHE_PATH = 'data/answer_cache.json'
+# put'lardan sonra diske yazmadan önce beklenen süre (sn); aradaki put'lar tek yazımda birleşir
+SAVE_DELAY = 2.0
+
+
+class SemanticCache:
+    """Anlamca benzer sorulara daha önce üretilmiş cevabı döndüren önbellek.
+
+    Sorular embedding vektörleriyle saklanır; yeni sorunun vektörü kayıtlı bir
+    soruya kosinüs benzerliği `threshold` üzerindeyse o cevap kullanılır.
+    Kayıtlar LRU sırasıyla `max_size` ile sınırlanır ve `ttl` saniye sonra düşer.
+    Diske yazma kilit dışında ve `save_delay` saniye gecikmeyle yapılır; bu
+    sürede gelen put'lar tek yazımda birleşir (save_delay=0 ise hemen yazılır).
+    Bekleyen yazım süreç kapanırken tamamlanır.
+    """
+
+    def __init__(self, threshold=0.92, max_size=512, ttl=24 * 3600, path=ANSWER_CACHE_PATH, save_delay=SAVE_DELAY):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self.path = path
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._keys = []
+        self._matrix = None
+        self._lock = threading.Lock()
+        # Yazımları sıraya koyar; _version her değişiklikte artar
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._version = 0
+        self._saved_version = 0
+        if path and os.path.exists(path):
+            self.load()
+        if path:
+            atexit.register(self.flush)
+
+    @staticmethod
+    def _key(question):
+        return " ".join(question.lower().split())
+
+    @staticmethod
+    def _unit(vector):
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _expire(self, now):
+        expired = [k for k, e in self._entries.items() if now - e['created'] > self.ttl]
+        for k in expired:
+            del self._entries[k]
+        if expired:
+            self._matrix = None
+
+    def get(self, vector):
+        """Yeterince benzer bir soru varsa cevabını, yoksa None döndürür"""
+        with self._lock:
+            self._expire(time.time())
+            if not self._entries:
+                self.misses += 1
+                return None
+            if self._matrix is None:
+                self._keys = list(self._entries)
+                self._matrix = np.stack([self._entries[k]['vector'] for k in self._keys])
+            scores = self._matrix @ self._unit(vector)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+            key = self._keys[best]
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]['answer']
+
+    def put(self, question, vector, answer):
+        """Cevabı önbelleğe ekler, gerekirse en eski kullanılanı çıkarır ve diske yazımı planlar"""
+        with self._lock:
+            key = self._key(question)
+            self._entries[key] = {
+                'question': question,
+                'answer': answer,
+                'vector': self._unit(vector),
+                'created': time.time(),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
+            self._version += 1
+            if self.path and self.save_delay and self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+        if self.path and not self.save_delay:
+            self.flush()
+
+    def flush(self):
+        """Bekleyen değişiklikleri diske yazar; JSON kilit dışında üretilir"""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if not self.path or self._version == self._saved_version:
+                return
+            version = self._version
+            snapshot = list(self._entries.values())
+        with self._save_lock:
+            # Daha yeni bir anlık görüntü yazıldıysa bu yazım atlanır
+            if version <= self._saved_version:
+                return
+            self._save(snapshot)
+            self._saved_version = version
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self.hits = self.misses = 0
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            self._version += 1
+            version = self._version
+        with self._save_lock:
+            if self.path and os.path.exists(self.path):
+                os.remove(self.path)
+            self._saved_version = version
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._entries),
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def _save(self, snapshot):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        entries = [
+            {
+                'question': e['question'],
+                'answer': e['answer'],
+                'vector': [round(float(x), 6) for x in e['vector']],
+                'created': e['created'],
+            }
+            for e in snapshot
+        ]
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Diskteki önbelleği yükler; süresi dolmuş kayıtları atlar"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f" Cevap önbelleği okunamadı ({e}), boş başlatılıyor")
+            return
+        now = time.time()
+        with self._lock:
+            for e in entries:
+                if now - e['created'] > self.ttl:
+                    continue
+                self._entries[self._key(e['question'])] = {
+                    'question': e['question'],
+                    'answer': e['answer'],
+                    'vector': np.asarray(e['vector'], dtype=np.float32),
+                    'created': e['created'],
+                }
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            self._matrix = None
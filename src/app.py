@@ -1,7 +1,16 @@
 import os
+import threading
+import time
+from itertools import chain
 from dotenv import load_dotenv
+import numpy as np
+import pandas as pd
 import streamlit as st
-from rag_pipeline import FinancialChatbot
+from calculator import (
+    MAX_MONTHS, STOPAJ, amortization_schedule, debt_payoff_months, debt_total_interest,
+    deposit_net_return, savings_balance, savings_months, sweep,
+)
+from warm_answers import QUICK_START_PROMPTS
 
 THEME_AWARE_CSS = """
 <style>
@@ -66,6 +75,69 @@ html[data-theme="dark"] :root {
 </style>
 """
 
+# Öğren sekmesi kategori içerikleri
+FAQ_CONTENT = {
+    "Kredi Notu": {
+        "summary": "Kredi notu; ödeme alışkanlığı, mevcut borçluluk ve kredi kullanım geçmişine göre belirlenir.",
+        "bullets": [
+            "Ödemeleri zamanında yapmak en güçlü etkendir.",
+            "Kredi kullanım oranını düşük tut (kullanılan limit / toplam limit).",
+            "Sık kredi/limit başvuruları kısa vadede notu olumsuz etkileyebilir.",
+            "Uzun ve sorunsuz geçmiş notu destekler."
+        ],
+        "tips": [
+            "Asgari değil tam ödeme yap.",
+            "Limitinin %30’unu aşmamaya çalış.",
+            "Gereksiz başvurulardan kaçın."
+        ],
+        "prompt": "Kredi notumu hızlı ve sürdürülebilir şekilde artırmak için kişisel bir plan öner."
+    },
+    "Vadeli Mevduat": {
+        "summary": "Vadeli mevduat, anapara korunurken vade sonunda faiz geliri sağlar.",
+        "bullets": [
+            "Vade kırılmadan çekimde faiz kaybı olabilir.",
+            "Stopaj sonrası net getiri hesaplanmalı.",
+            "Faiz oranı ve vade seçimi net getiriyi belirler."
+        ],
+        "tips": [
+            "Vade sonunda otomatik yenileme koşullarını kontrol et.",
+            "Acil nakit için vadesiz kenarda tutar bırak."
+        ],
+        "prompt": "100.000 TL için 32 gün vadede stopaj sonrası net getiriyi hesapla; farklı oranlara duyarlılık analizi yap."
+    },
+    "Fonlar": {
+        "summary": "Yatırım fonları profesyonel yönetilen portföylerdir; risk ve getiri profilleri farklıdır.",
+        "bullets": [
+            "Para piyasası fonları düşük riskli ve likittir.",
+            "Borçlanma araçları fonları orta riskte sabit getirili enstrümanlara yatırım yapar.",
+            "Hisse senedi fonları daha değişkendir; uzun vadede potansiyel getiri yüksektir.",
+            "Katılım fonları faizsiz ilkelere göre yönetilir."
+        ],
+        "tips": [
+            "Risk-getiri tercihini ve vade hedefini netleştir.",
+            "Masraf ve yönetim ücretlerini kıyasla."
+        ],
+        "prompt": "Orta risk profiline uygun üç farklı fon dağılımı öner ve aylık birikim planı çıkar."
+    },
+    "Altın/Döviz Riskleri": {
+        "summary": "Altın ve döviz, kur ve küresel faktörlere duyarlı varlıklardır; kısa vadede oynaklık yüksektir.",
+        "bullets": [
+            "Kur riski ve jeopolitik riskler fiyatları etkiler.",
+            "Merkez bankası adımları ve faizler önemli belirleyicidir.",
+            "Uzun vadede portföye çeşitlendirme sağlar."
+        ],
+        "tips": [
+            "Tek varlığa yoğunlaşma riskini azalt.",
+            "Kademeli alım stratejisiyle fiyat dalgalanmasını yumuşat."
+        ],
+        "prompt": "Gelirimin yüzde kaçını altın/dövizde tutmalıyım? Risk iştahıma göre bir dağılım öner."
+    },
+}
+
+# en çok tıklanan sabit prompt'lar; cevapları açılışta önceden hesaplanır
+WARM_PROMPTS = QUICK_START_PROMPTS + [c["prompt"] for c in FAQ_CONTENT.values()]
+WARM_REFRESH_SECONDS = 3 * 3600
+
 
 # 0) page config en başta olmalı
 st.set_page_config(page_title="Finansal Asistan", page_icon="🏦", layout="wide")
@@ -93,16 +165,112 @@ with st.container():
         unsafe_allow_html=True
     )
 
-# 3) chatbot yükleme
+# 3) chatbot yükleme: arka planda ısınır, sayfa beklemeden çizilir
+class ChatbotLoader:
+    """FinancialChatbot'u arka plan thread'inde kurar.
+
+    langchain, FAISS ve sentence-transformers importları da bu thread'de
+    yapılır; böylece ilk ziyaretçi sayfayı ve sekmeleri hemen görür.
+    CHATBOT_SERVER_URL tanımlıysa yerel model yerine server.py'ye bağlanılır.
+    """
+
+    def __init__(self):
+        self.chatbot = None
+        self.error = None
+        self._ready = threading.Event()
+        threading.Thread(target=self._load, name="chatbot-warmup", daemon=True).start()
+
+    def _load(self):
+        try:
+            server_url = os.getenv("CHATBOT_SERVER_URL")
+            if server_url:
+                # İnce istemci: model ve index server.py sürecinde yüklü
+                from client import RemoteChatbot
+                chatbot = RemoteChatbot(server_url)
+                chatbot.health()
+            else:
+                from rag_pipeline import FinancialChatbot  # ağır importlar
+                chatbot = FinancialChatbot()
+            chatbot.warm_up(WARM_PROMPTS, refresh_interval=WARM_REFRESH_SECONDS)
+            self.chatbot = chatbot
+        except Exception as e:
+            self.error = e
+        finally:
+            self._ready.set()
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+
 @st.cache_resource(show_spinner=False)
 def load_chatbot():
+    return ChatbotLoader()
+
+loader = load_chatbot()
+chatbot = loader.chatbot
+
+
+@st.fragment(run_every=2)
+def warmup_watcher():
+    """Isınma sürerken durumu gösterir, bitince sayfayı bir kez yeniler"""
+    if loader.ready:
+        st.rerun()
+    st.info("Asistan ısınıyor... ⏳ Model ve index hazırlanıyor.")
+
+
+def stream_answer(prompt):
+    """Cevabı geldikçe çizer ve tam metni döndürür; spinner ilk parçaya kadar döner"""
     try:
-        return FinancialChatbot()
+        with st.spinner("Analiz ediliyor..."):
+            stream = loader.chatbot.ask_stream(prompt)
+            first = next(stream, "")  # retrieval + ilk token
+        return st.write_stream(chain([first], stream))
     except Exception as e:
-        st.error(f"Sistem başlatılamadı: {e}")
-        return None
+        text = f"Hata: {e}"
+        st.markdown(text)
+        return text
+
+
+STAGE_LABELS = {
+    "lexical": "BM25 arama",
+    "embed": "Soru embedding",
+    "cache": "Önbellek",
+    "search": "FAISS arama",
+    "prompt": "Prompt",
+    "first_token": "İlk token",
+    "llm": "LLM",
+    "total": "Toplam",
+}
+
+# Araçlar sekmesindeki duyarlılık tablolarının senaryoları
+SCENARIO_STEPS = [0.5, 0.75, 1.0, 1.25, 1.5, 2.0]
+SCENARIO_RATE_STEPS = [-1.0, -0.5, 0.0, 0.5, 1.0]
+DEPOSIT_RATE_STEPS = [-10.0, -5.0, 0.0, 5.0, 10.0]
+DEPOSIT_TERMS = [32, 92, 181, 365]
+
+
+def scenario_values(value, steps, relative=True):
+    """Girilen değerin etrafında senaryo değerleri üretir (oranlar için toplamsal)"""
+    steps = np.asarray(steps, dtype=float)
+    values = value * steps if relative else value + steps
+    return np.unique(np.clip(values, 0.0, None))
+
+
+def month_cell(months):
+    """Hiç bitmeyen senaryolar '—', MAX_MONTHS ve üstü '≥100 yıl' gösterilir"""
+    if not np.isfinite(months):
+        return "—"
+    if months >= MAX_MONTHS:
+        return f"≥{MAX_MONTHS // 12} yıl"
+    return str(int(months))
+
+
+def months_table(grid, rows, cols):
+    """Ay sayısı ızgarasını tabloya çevirir (hücreler month_cell ile yazılır)"""
+    cells = [[month_cell(m) for m in row] for row in grid]
+    return pd.DataFrame(cells, index=[f"{r:,.0f} TL" for r in rows], columns=[f"%{c:.2f}" for c in cols])
 
-chatbot = load_chatbot()
 
 # 4) session state
 if "messages" not in st.session_state:
@@ -110,14 +278,73 @@ if "messages" not in st.session_state:
 if "stats" not in st.session_state:
     st.session_state.stats = {"turns": 0, "avg_latency_ms": 0}
 
+# Kenar çubuğu metrikleri; sohbet turları tüm sayfayı yeniden çalıştırmadığı için
+# panel kendi kendine yenilenir
+PERF_REFRESH_SECONDS = 10
+# Sohbet sekmesinde her çalıştırmada çizilen son mesaj sayısı
+HISTORY_WINDOW = 30
+
+
+@st.fragment(run_every=PERF_REFRESH_SECONDS)
+def performance_panel():
+    stats = st.session_state.stats
+    m1, m2 = st.columns(2)
+    m1.metric("Tur", stats["turns"])
+    m2.metric("Ort. yanıt", f"{stats['avg_latency_ms']:.0f} ms")
+    bot_stats = None
+    bot = loader.chatbot
+    if bot:
+        try:
+            bot_stats = bot.stats()
+        except Exception as e:  # uzak sunucu erişilemiyor olabilir
+            st.caption(f"Metrikler alınamadı: {e}")
+    if bot_stats:
+        latency = bot_stats["latency"]
+        if latency:
+            rows = [
+                {"Aşama": STAGE_LABELS.get(stage, stage),
+                 "p50 (ms)": round(v["p50"] * 1000, 1),
+                 "p95 (ms)": round(v["p95"] * 1000, 1),
+                 "n": v["count"]}
+                for stage, v in latency.items()
+            ]
+            st.dataframe(rows, hide_index=True, use_container_width=True)
+        tokens = bot_stats["tokens"]
+        if tokens:
+            st.caption(
+                f"Prompt token (p50/p95): {tokens['input']['p50']:.0f} / {tokens['input']['p95']:.0f}, "
+                f"bağlam {tokens['context']['p50']:.0f}"
+            )
+        st.caption(f"Embedding'siz anahtar kelime cevabı: {bot_stats['lexical_fast_path']}")
+        router = bot_stats["router"]
+        st.caption(f"LLM'siz cevap: {router['calculator']} hesaplama, {router['faq']} SSS")
+        coalesced = bot_stats["coalesced"]
+        st.caption(f"Birleştirilen eşzamanlı soru: {coalesced['coalesced']} / {coalesced['calls']}")
+        llm = bot_stats["llm"]
+        st.caption(
+            f"LLM: {llm['timeouts']} zaman aşımı, {llm['fallbacks']} kayıtlı cevap, "
+            f"{llm['retries']} tekrar, {llm['hedged']} hedge"
+        )
+        precomputed = bot_stats["precomputed"]
+        st.caption(f"Hazır cevaplar: {precomputed['size']} / {len(WARM_PROMPTS)} ({precomputed['hits']} kullanım)")
+        cache = bot_stats.get("answer_cache")
+        if cache:
+            st.caption(
+                f"Cevap önbelleği: %{cache['hit_rate'] * 100:.0f} isabet "
+                f"({cache['hits']}/{cache['hits'] + cache['misses']}), {cache['size']} kayıt"
+            )
+
+
 # 5) sidebar: durum, yönetim, metrikler
-# 5) sidebar: durum, yönetim
 with st.sidebar:
     st.subheader("Sistem Durumu")
     if chatbot:
         st.success("Asistan Çevrimiçi ✅")
+    elif not loader.ready:
+        warmup_watcher()
     else:
         st.warning("Asistan Çevrimdışı ⚠️")
+        st.error(f"Sistem başlatılamadı: {loader.error}")
 
     st.divider()
     st.subheader("Yönetim")
@@ -139,84 +366,98 @@ with st.sidebar:
             mime="text/plain"
         )
 
+    st.divider()
+    st.subheader("Performans")
+    performance_panel()
+
     st.divider()
     st.caption("Geliştirici: Akbank GenAI Projesi")
 
 
-# 6) sekmeler
-tab_chat, tab_learn, tab_tools = st.tabs(["Sohbet", "Öğren", "Araçlar"])
+def render_message(msg):
+    avatar = "🧑" if msg["role"] == "user" else "💼"
+    with st.chat_message(msg["role"], avatar=avatar):
+        st.markdown(msg["content"])
+
+
+def feedback_buttons(turn):
+    fb1, fb2, _ = st.columns([0.15, 0.2, 0.65])
+    with fb1:
+        if st.button("Yararlı", key=f"fb_up_{turn}"):
+            st.toast("Teşekkürler, geri bildirimin kaydedildi.")
+    with fb2:
+        if st.button("Yararsız", key=f"fb_dn_{turn}"):
+            st.toast("Geri bildirimin alındı.")
+
+
+def answer_pending(messages):
+    """Son kullanıcı mesajını cevaplar ve cevabı geçmişe ekler"""
+    if loader.chatbot is not None:
+        with st.chat_message("assistant", avatar="💼"):
+            started = time.perf_counter()
+            text = stream_answer(messages[-1]["content"])
+            elapsed_ms = (time.perf_counter() - started) * 1000
+        messages.append({"role": "assistant", "content": text})
+        stats = st.session_state.stats
+        stats["turns"] += 1
+        stats["avg_latency_ms"] += (elapsed_ms - stats["avg_latency_ms"]) / stats["turns"]
+        feedback_buttons(len(messages))
+    elif not loader.ready:
+        # soru bekletilir; ısınma bitince sayfa yenilenir ve cevap üretilir
+        with st.chat_message("assistant", avatar="💼"):
+            st.caption("Asistan hazırlanıyor, sorunuz birazdan yanıtlanacak...")
+    else:
+        messages.append({"role": "assistant", "content": "Sistem çevrimdışı."})
+        render_message(messages[-1])
+
+
+@st.fragment
+def chat_panel():
+    """Sohbet sekmesi; yeni bir tur yalnızca bu fragment'ı yeniden çalıştırır.
+
+    Yeni mesaj aynı çalıştırmada geçmişe eklenip cevaplanır (st.rerun yok).
+    Geçmişin yalnızca son HISTORY_WINDOW mesajı çizilir; böylece tur başına
+    iş, sohbet uzadıkça artmaz.
+    """
+    messages = st.session_state.messages
 
-with tab_chat:
     # hızlı başlangıç çipleri
     st.write("Hızlı Başlangıç")
+    chosen = None
     cols = st.columns(4)
-    examples = [
-        "Aylık bütçeyi nasıl planlarım?",
-        "Kredi kartı borcunu azaltmanın yolları?",
-        "Acil durum fonu için hedef ne olmalı?",
-        "Vadeli mevduat ile fon farkı nedir?"
-    ]
-    for i, q in enumerate(examples):
+    for i, q in enumerate(QUICK_START_PROMPTS):
         with cols[i]:
             if st.button(q, key=f"chip_{i}", use_container_width=True):
-                st.session_state.messages.append({"role": "user", "content": q})
-                st.rerun()
+                chosen = q
 
     st.divider()
 
-    # geçmişi çiz
-    for msg in st.session_state.messages:
-        avatar = "🧑" if msg["role"] == "user" else "💼"
-        with st.chat_message(msg["role"], avatar=avatar):
-            st.markdown(msg["content"])
-
-    # --- OTOMATİK CEVAP: son mesaj kullanıcıysa yanıt üret
-    if st.session_state.messages and st.session_state.messages[-1]["role"] == "user":
-        if chatbot is not None:
-            user_prompt = st.session_state.messages[-1]["content"]
-            with st.chat_message("assistant", avatar="💼"):
-                with st.spinner("Analiz ediliyor..."):
-                    try:
-                        raw = chatbot.ask(user_prompt)  # str veya {text, sources}
-                    except Exception as e:
-                        raw = {"text": f"Hata: {e}", "sources": []}
-
-                    if isinstance(raw, str):
-                        text, sources = raw, []
-                    else:
-                        text = raw.get("text") or raw.get("answer") or ""
-                        sources = raw.get("sources") or raw.get("citations") or []
-
-                    st.markdown(text)
-                    if sources:
-                        with st.expander("Kaynaklar"):
-                            for s in sources:
-                                st.markdown(f"- {s}")
-
-                    # (opsiyonel) geri bildirim butonları
-                    fb1, fb2, _ = st.columns([0.15, 0.2, 0.65])
-                    with fb1:
-                        if st.button("Yararlı", key=f"fb_up_{len(st.session_state.messages)}"):
-                            st.toast("Teşekkürler, geri bildirimin kaydedildi.")
-                    with fb2:
-                        if st.button("Yararsız", key=f"fb_dn_{len(st.session_state.messages)}"):
-                            st.toast("Geri bildirimin alındı.")
-
-                    st.session_state.messages.append({"role": "assistant", "content": text})
-                    st.session_state.stats["turns"] += 1
-                    st.rerun()
-        else:
-            st.session_state.messages.append({"role": "assistant", "content": "Sistem çevrimdışı."})
-            st.rerun()
+    # giriş kutusu geçmişin altında kalır; geçmiş önce ayrılan kaba çizilir
+    history = st.container()
+    new_text = st.chat_input("Finansal bir soru yazın...") or chosen
 
-    # giriş (sadece mesaj ekle, yanıt üretimini yukarıdaki blok yapıyor)
-    user_text = st.chat_input("Finansal bir soru yazın...")
-    if user_text:
-        st.session_state.messages.append({"role": "user", "content": user_text})
-        st.rerun()
+    with history:
+        hidden = max(0, len(messages) - HISTORY_WINDOW)
+        if hidden:
+            if st.toggle("Önceki mesajları göster", key="show_full_history"):
+                for msg in messages[:hidden]:
+                    render_message(msg)
+            else:
+                st.caption(f"{hidden} önceki mesaj gizlendi.")
+        for msg in messages[hidden:]:
+            render_message(msg)
 
+        if new_text:
+            messages.append({"role": "user", "content": new_text})
+            render_message(messages[-1])
+        if messages and messages[-1]["role"] == "user":
+            answer_pending(messages)
+        elif messages:
+            feedback_buttons(len(messages))
 
-with tab_learn:
+
+@st.fragment
+def learn_panel():
     st.subheader("Kısa Rehberler")
     c1, c2 = st.columns(2)
     with c1:
@@ -230,69 +471,10 @@ with tab_learn:
     st.divider()
     st.markdown("### Sık Sorulanlar")
 
-    # 1) Kategori içerikleri
-    FAQ_CONTENT = {
-        "Kredi Notu": {
-            "summary": "Kredi notu; ödeme alışkanlığı, mevcut borçluluk ve kredi kullanım geçmişine göre belirlenir.",
-            "bullets": [
-                "Ödemeleri zamanında yapmak en güçlü etkendir.",
-                "Kredi kullanım oranını düşük tut (kullanılan limit / toplam limit).",
-                "Sık kredi/limit başvuruları kısa vadede notu olumsuz etkileyebilir.",
-                "Uzun ve sorunsuz geçmiş notu destekler."
-            ],
-            "tips": [
-                "Asgari değil tam ödeme yap.",
-                "Limitinin %30’unu aşmamaya çalış.",
-                "Gereksiz başvurulardan kaçın."
-            ],
-            "prompt": "Kredi notumu hızlı ve sürdürülebilir şekilde artırmak için kişisel bir plan öner."
-        },
-        "Vadeli Mevduat": {
-            "summary": "Vadeli mevduat, anapara korunurken vade sonunda faiz geliri sağlar.",
-            "bullets": [
-                "Vade kırılmadan çekimde faiz kaybı olabilir.",
-                "Stopaj sonrası net getiri hesaplanmalı.",
-                "Faiz oranı ve vade seçimi net getiriyi belirler."
-            ],
-            "tips": [
-                "Vade sonunda otomatik yenileme koşullarını kontrol et.",
-                "Acil nakit için vadesiz kenarda tutar bırak."
-            ],
-            "prompt": "100.000 TL için 32 gün vadede stopaj sonrası net getiriyi hesapla; farklı oranlara duyarlılık analizi yap."
-        },
-        "Fonlar": {
-            "summary": "Yatırım fonları profesyonel yönetilen portföylerdir; risk ve getiri profilleri farklıdır.",
-            "bullets": [
-                "Para piyasası fonları düşük riskli ve likittir.",
-                "Borçlanma araçları fonları orta riskte sabit getirili enstrümanlara yatırım yapar.",
-                "Hisse senedi fonları daha değişkendir; uzun vadede potansiyel getiri yüksektir.",
-                "Katılım fonları faizsiz ilkelere göre yönetilir."
-            ],
-            "tips": [
-                "Risk-getiri tercihini ve vade hedefini netleştir.",
-                "Masraf ve yönetim ücretlerini kıyasla."
-            ],
-            "prompt": "Orta risk profiline uygun üç farklı fon dağılımı öner ve aylık birikim planı çıkar."
-        },
-        "Altın/Döviz Riskleri": {
-            "summary": "Altın ve döviz, kur ve küresel faktörlere duyarlı varlıklardır; kısa vadede oynaklık yüksektir.",
-            "bullets": [
-                "Kur riski ve jeopolitik riskler fiyatları etkiler.",
-                "Merkez bankası adımları ve faizler önemli belirleyicidir.",
-                "Uzun vadede portföye çeşitlendirme sağlar."
-            ],
-            "tips": [
-                "Tek varlığa yoğunlaşma riskini azalt.",
-                "Kademeli alım stratejisiyle fiyat dalgalanmasını yumuşat."
-            ],
-            "prompt": "Gelirimin yüzde kaçını altın/dövizde tutmalıyım? Risk iştahıma göre bir dağılım öner."
-        },
-    }
-
-    # 2) Kategori seçimi
+    # 1) Kategori seçimi
     category = st.selectbox("Konu seçin", list(FAQ_CONTENT.keys()))
 
-    # 3) İçeriği göster
+    # 2) İçeriği göster
     data = FAQ_CONTENT[category]
     st.markdown(f"#### {category}")
     st.write(data["summary"])
@@ -311,56 +493,100 @@ with tab_learn:
     # İstersen doğrudan burada da cevap üretebilirsin (RAG çalışsın)
     with st.expander("Bu sekmede hızlı cevap al (isteğe bağlı)"):
         if st.button("Bu kategori için açıklama üret"):
-            if chatbot is None:
+            if loader.chatbot is None and not loader.ready:
+                st.info("Asistan hâlâ ısınıyor, lütfen birkaç saniye sonra tekrar deneyin.")
+            elif loader.chatbot is None:
                 st.error("Asistan şu anda çevrimdışı.")
             else:
-                with st.spinner("Analiz ediliyor..."):
-                    try:
-                        raw = chatbot.ask(data["prompt"])
-                    except Exception as e:
-                        raw = {"text": f"Hata: {e}", "sources": []}
-
-                    if isinstance(raw, str):
-                        text, sources = raw, []
-                    else:
-                        text = raw.get("text") or raw.get("answer") or ""
-                        sources = raw.get("sources") or raw.get("citations") or []
-
-                    st.markdown(text)
-                    if sources:
-                        with st.expander("Kaynaklar"):
-                            for s in sources:
-                                st.markdown(f"- {s}")
+                stream_answer(data["prompt"])
 
 
-with tab_tools:
+@st.fragment
+def tools_panel():
     st.subheader("Hesaplama Araçları")
+    st.caption("Sonuçlar girdiler değiştikçe anında güncellenir; tablolar farklı ödeme ve faiz senaryolarını gösterir.")
     colA, colB = st.columns(2)
 
     with colA:
-        st.markdown("#### Borç Azaltma Basit Simülasyon")
+        st.markdown("#### Borç Azaltma Simülasyonu")
         bakiye = st.number_input("Başlangıç borcu", min_value=0.0, value=20000.0, step=500.0)
         faiz = st.number_input("Aylık faiz (%)", min_value=0.0, value=2.5, step=0.1)
         odeme = st.number_input("Aylık ödeme", min_value=0.0, value=1500.0, step=100.0)
-        if st.button("Hesapla", key="debt_calc"):
-            if odeme <= bakiye * (faiz/100):
-                st.error("Aylık ödeme faizden düşük; borç büyür. Ödemeyi artır.")
-            else:
-                import math
-                r = faiz/100
-                ay = math.log(odeme/(odeme - bakiye*r)) / math.log(1+r)
-                st.success(f"Tahmini bitiş: {math.ceil(ay)} ay")
+        ay = debt_payoff_months(bakiye, odeme, faiz / 100)
+        if not np.isfinite(ay):
+            st.error("Aylık ödeme faizden düşük; borç büyür. Ödemeyi artır.")
+        else:
+            toplam_faiz = debt_total_interest(bakiye, odeme, faiz / 100)
+            st.success(f"Tahmini bitiş: {int(ay)} ay · toplam faiz {float(toplam_faiz):,.0f} TL")
+            plan = amortization_schedule(bakiye, odeme, faiz / 100)
+            st.line_chart(pd.DataFrame({"Kalan borç": plan["balance"]}, index=plan["month"]))
+            with st.expander("Ödeme planı"):
+                st.dataframe(pd.DataFrame({
+                    "Ay": plan["month"], "Ödeme": plan["payment"].round(2), "Faiz": plan["interest"].round(2),
+                    "Anapara": plan["principal"].round(2), "Kalan": plan["balance"].round(2),
+                }), hide_index=True, use_container_width=True)
+        odemeler = scenario_values(odeme, SCENARIO_STEPS)
+        faizler = scenario_values(faiz, SCENARIO_RATE_STEPS, relative=False)
+        st.caption("Bitiş süresi (ay): satırlar aylık ödeme, sütunlar aylık faiz; "
+                   "— ödemenin faizi karşılamadığı, hiç kapanmayan senaryolardır")
+        st.dataframe(months_table(
+            sweep(debt_payoff_months, {"payment": odemeler}, {"rate": faizler / 100}, balance=bakiye),
+            odemeler, faizler
+        ), use_container_width=True)
 
     with colB:
         st.markdown("#### Tasarruf Hedefi")
         hedef = st.number_input("Hedef tutar", min_value=0.0, value=60000.0, step=1000.0)
         aylik = st.number_input("Aylık birikim", min_value=0.0, value=2500.0, step=100.0)
         getiri = st.number_input("Aylık getiri (%)", min_value=0.0, value=0.6, step=0.1)
-        if st.button("Planla", key="save_plan"):
-            r = getiri/100
-            ay = 0
-            toplam = 0.0
-            while toplam < hedef and ay < 1200:
-                toplam = toplam*(1+r) + aylik
-                ay += 1
-            st.success(f"Hedefe ulaşma süresi: {ay} ay")
\ No newline at end of file
+        ay = int(savings_months(hedef, aylik, getiri / 100))
+        if ay >= MAX_MONTHS:
+            st.warning(f"Bu birikimle hedefe {MAX_MONTHS // 12} yıl içinde ulaşılamıyor.")
+        else:
+            st.success(f"Hedefe ulaşma süresi: {ay} ay")
+            aylar = np.arange(ay + 1)
+            st.line_chart(pd.DataFrame({
+                "Birikim": savings_balance(aylik, getiri / 100, aylar),
+                "Hedef": np.full(len(aylar), hedef),
+            }, index=aylar))
+        birikimler = scenario_values(aylik, SCENARIO_STEPS)
+        getiriler = scenario_values(getiri, SCENARIO_RATE_STEPS, relative=False)
+        st.caption("Hedefe süre (ay): satırlar aylık birikim, sütunlar aylık getiri")
+        st.dataframe(months_table(
+            sweep(savings_months, {"monthly": birikimler}, {"rate": getiriler / 100}, target=hedef),
+            birikimler, getiriler
+        ), use_container_width=True)
+
+    st.divider()
+    st.markdown("#### Vadeli Mevduat Net Getiri")
+    c1, c2, c3, c4 = st.columns(4)
+    anapara = c1.number_input("Anapara", min_value=0.0, value=100000.0, step=5000.0)
+    yillik = c2.number_input("Yıllık faiz (%)", min_value=0.0, value=45.0, step=0.5)
+    gun = c3.number_input("Vade (gün)", min_value=1, value=32, step=1)
+    stopaj = c4.number_input("Stopaj (%)", min_value=0.0, max_value=100.0, value=STOPAJ * 100, step=2.5)
+    net = float(deposit_net_return(anapara, yillik / 100, gun, stopaj / 100))
+    brut = float(deposit_net_return(anapara, yillik / 100, gun, 0.0))
+    st.success(f"Net getiri: {net:,.2f} TL (brüt {brut:,.2f} TL, stopaj {brut - net:,.2f} TL)")
+    oranlar = scenario_values(yillik, DEPOSIT_RATE_STEPS, relative=False)
+    vadeler = np.array(DEPOSIT_TERMS)
+    getiri_tablosu = sweep(deposit_net_return, {"annual_rate": oranlar / 100}, {"days": vadeler},
+                           principal=anapara, stopaj=stopaj / 100)
+    st.caption("Net getiri (TL): satırlar yıllık faiz, sütunlar vade")
+    st.dataframe(pd.DataFrame(
+        getiri_tablosu.round(2), index=[f"%{o:.1f}" for o in oranlar], columns=[f"{v} gün" for v in vadeler]
+    ), use_container_width=True)
+    st.bar_chart(pd.DataFrame(getiri_tablosu, index=[f"%{o:.1f}" for o in oranlar],
+                              columns=[f"{v} gün" for v in vadeler]))
+
+
+# 6) sekmeler: her sekme ayrı fragment; etkileşim yalnızca kendi sekmesini yeniden çalıştırır
+tab_chat, tab_learn, tab_tools = st.tabs(["Sohbet", "Öğren", "Araçlar"])
+
+with tab_chat:
+    chat_panel()
+
+with tab_learn:
+    learn_panel()
+
+with tab_tools:
+    tools_panel()
@@ -0,0 +1,352 @@
+"""FinancialChatbot için ağ gerektirmeyen gecikme ve verim ölçümü.
+
+Gemini yerine sabit gecikmeli FakeLLM kullanılır; böylece ölçülen süreler
+açılış, embedding, FAISS araması ve pipeline'ın kendi maliyetini gösterir.
+
+Kullanım:
+    python benchmark.py --queries 200 --llm-delay 0.3 --concurrency 1,4,16
+    python benchmark.py --compare-embeddings torch,onnx,onnx-int8
+    python benchmark.py --embed-workers 4 --embed-batch-size 2048
+    python benchmark.py --shared-memory 4
+    python benchmark.py --index-config Flat --index-config "IVF64,Flat nprobe=8" \
+        --index-config "HNSW32 efSearch=64" --index-config "IVF64,PQ16 nprobe=8" --index-config SQfp16
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from corpus import iter_records, resolve_corpus_path
+from embeddings import BUILD_BATCH_SIZE, create_embeddings
+from llm_backends import FakeLLM
+from metrics import current_rss_mb, process_memory_mb, summarize
+from mmap_store import INDEX_FILE
+from rag_pipeline import FinancialChatbot, RETRIEVAL_K, build_documents, build_faiss_index, index_memory_bytes
+from resilience import LLM_TIMEOUT
+
+
+def load_queries(data_path, n, seed=42):
+    """Veri dosyasındaki sorulardan tekrarlanabilir bir örnek seçer"""
+    questions = [item['question'] for item in iter_records(resolve_corpus_path(data_path))]
+    rng = random.Random(seed)
+    return [rng.choice(questions) for _ in range(n)]
+
+
+def build_bot(args, cache_dir):
+    start = time.perf_counter()
+    bot = FinancialChatbot(
+        data_path=args.data,
+        cache_dir=cache_dir,
+        answer_cache=False,
+        index_mode=args.index_mode,
+        llm=FakeLLM(delay=args.llm_delay),
+        llm_timeout=args.llm_timeout,
+        hedge_after=args.hedge_after,
+        llm_concurrency=max(int(c) for c in args.concurrency.split(',')),
+        embed_batch_size=args.embed_batch_size,
+        embed_workers=args.embed_workers,
+    )
+    timings = dict(bot.startup_timings)
+    timings['total'] = time.perf_counter() - start
+    if timings['embed']:
+        timings['docs_per_s'] = bot.embed_rate
+    return bot, timings
+
+
+def bench_retrieval(bot, queries):
+    embed, search = [], []
+    for q in queries:
+        start = time.perf_counter()
+        vector = bot.embeddings.embed_query(q)
+        mid = time.perf_counter()
+        bot.retrieve(vector)
+        embed.append(mid - start)
+        search.append(time.perf_counter() - mid)
+    total = [a + b for a, b in zip(embed, search)]
+    return {'embed': summarize(embed), 'search': summarize(search), 'total': summarize(total)}
+
+
+def _timed_ask(bot, question):
+    start = time.perf_counter()
+    bot.ask(question)
+    return time.perf_counter() - start
+
+
+def bench_ask(bot, queries):
+    return summarize([_timed_ask(bot, q) for q in queries])
+
+
+def bench_throughput(bot, queries, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(lambda q: _timed_ask(bot, q), queries))
+    wall = time.perf_counter() - start
+    return {'concurrency': concurrency, 'rps': len(queries) / wall, 'latency': summarize(latencies)}
+
+
+def _probe_embeddings(backend, corpus, queries, k):
+    """Tek bir embedding backend'ini ayrı süreçte ölçer (RSS karşılaştırması için)"""
+    rss_before = current_rss_mb()
+    start = time.perf_counter()
+    embeddings = create_embeddings(backend)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = np.asarray(embeddings.embed_documents(corpus), dtype=np.float32)
+    corpus_s = time.perf_counter() - start
+
+    latencies, topk = [], []
+    for q in queries:
+        start = time.perf_counter()
+        vector = np.asarray(embeddings.embed_query(q), dtype=np.float32)
+        latencies.append(time.perf_counter() - start)
+        # FAISS IndexFlatL2 ile aynı sıralama
+        distances = ((matrix - vector) ** 2).sum(axis=1)
+        topk.append(np.argsort(distances)[:k].tolist())
+    return {
+        'backend': backend,
+        'load_s': load_s,
+        'corpus_docs_per_s': len(corpus) / corpus_s if corpus_s else 0.0,
+        'rss_mb': current_rss_mb() - rss_before,
+        'query': summarize(latencies),
+        'topk': topk,
+    }
+
+
+def compare_embeddings(args, backends, queries):
+    """Backend'lerin retrieval sonuçlarını ilk backend'e göre karşılaştırır"""
+    corpus, _, _ = build_documents(iter_records(resolve_corpus_path(args.data)), 'full')
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for backend in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results.append(pool.submit(_probe_embeddings, backend, corpus, queries, RETRIEVAL_K).result())
+
+    reference = results[0]
+    for row in results:
+        pairs = list(zip(reference['topk'], row.pop('topk')))
+        row['top1_agreement'] = sum(a[0] == b[0] for a, b in pairs) / len(pairs)
+        row['overlap_at_k'] = sum(len(set(a) & set(b)) / len(a) for a, b in pairs) / len(pairs)
+
+    print(f"\n=== Embedding backend karşılaştırması (referans: {reference['backend']}) ===")
+    for row in results:
+        print(
+            f" {row['backend']:<10} sorgu {_ms(row['query'])}  RSS +{row['rss_mb']:.0f} MB  "
+            f"corpus {row['corpus_docs_per_s']:.0f} dok/sn  top1 %{row['top1_agreement'] * 100:.1f}  "
+            f"overlap@{RETRIEVAL_K} %{row['overlap_at_k'] * 100:.1f}"
+        )
+    return results
+
+
+def parse_index_config(spec):
+    """'IVF64,Flat nprobe=8' -> ('IVF64,Flat', {'nprobe': 8})"""
+    factory, *params = spec.split()
+    return factory, {name: int(value) for name, value in (p.split('=') for p in params)}
+
+
+def compare_index_configs(bot, specs, queries, k=RETRIEVAL_K):
+    """Aynı vektörler üzerinde farklı FAISS index tiplerini karşılaştırır.
+
+    Her yapılandırma için eğitim+ekleme süresi, bellek, sorgu gecikmesi ve
+    tam aramaya (Flat) göre recall@k raporlanır.
+    """
+    exact = bot.vectorstore.index
+    vectors = exact.reconstruct_n(0, exact.ntotal)
+    query_vectors = np.asarray([bot.embeddings.embed_query(q) for q in queries], dtype=np.float32)
+    _, truth = faiss_search(exact, query_vectors, k)
+
+    results = []
+    for spec in specs:
+        factory, params = parse_index_config(spec)
+        start = time.perf_counter()
+        index = build_faiss_index(vectors, factory, params)
+        index.add(vectors)
+        build_s = time.perf_counter() - start
+
+        latencies, found = [], []
+        for vector in query_vectors:
+            start = time.perf_counter()
+            _, ids = faiss_search(index, vector[None, :], k)
+            latencies.append(time.perf_counter() - start)
+            found.append(ids[0])
+        recall = sum(len(set(f) & set(t)) / k for f, t in zip(found, truth)) / len(queries)
+        results.append({
+            'config': spec,
+            'build_s': build_s,
+            'bytes': index_memory_bytes(index),
+            'query': summarize(latencies),
+            'recall_at_k': recall,
+        })
+
+    print(f"\n=== FAISS index karşılaştırması ({exact.ntotal} vektör, k={k}) ===")
+    for row in results:
+        print(
+            f" {row['config']:<24} {row['bytes'] / 1024:>8.0f} KB  build {row['build_s']:.2f}s  "
+            f"{_ms(row['query'])}  recall@{k} %{row['recall_at_k'] * 100:.1f}"
+        )
+    return results
+
+
+def _memory_worker(data_path, cache_dir, index_mode, shared, queries, ready, stop):
+    """Ayrı süreçte chatbot kurar, sorguları çalıştırır ve ölçüm bitene kadar bekler"""
+    before = process_memory_mb()
+    bot = FinancialChatbot(
+        data_path=data_path, cache_dir=cache_dir, answer_cache=False, index_mode=index_mode,
+        llm=FakeLLM(delay=0), shared_index=shared,
+    )
+    for q in queries:
+        bot.retrieve(bot.embeddings.embed_query(q))
+    ready.put((os.getpid(), before, bot.index_dir))
+    stop.wait()
+
+
+def _run_workers(args, cache_dir, shared, workers, queries):
+    """`workers` süreci aynı anda çalıştırır; hepsi hazırken bellek değerlerini okur"""
+    context = multiprocessing.get_context('spawn')
+    ready, stop = context.Queue(), context.Event()
+    processes = [
+        context.Process(target=_memory_worker, args=(args.data, cache_dir, args.index_mode, shared, queries, ready, stop))
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        started = [ready.get() for _ in processes]
+        rows = [dict(process_memory_mb(pid) or {}, pid=pid, before=before) for pid, before, _ in started]
+        index_dir = started[0][2]
+    finally:
+        stop.set()
+        for process in processes:
+            process.join()
+    return rows, index_dir
+
+
+def measure_shared_memory(args, cache_dir, workers, queries):
+    """Aynı anda çalışan süreçlerin belleğini index kopyalı ve paylaşımlı modda ölçer.
+
+    RSS paylaşılan sayfaları her süreçte tam sayar; PSS onları paylaşan süreç
+    sayısına böler, bu yüzden toplam PSS makinedeki gerçek bellek kullanımıdır.
+    Index önce tek süreçte kurulur ki worker'lar aynı önbelleği açsın.
+    """
+    if process_memory_mb() is None:
+        raise RuntimeError("Bellek ölçümü için /proc/<pid>/smaps_rollup gerekli (Linux)")
+    _, index_dir = _run_workers(args, cache_dir, True, 1, queries[:1])
+    results = {'workers': workers, 'index_mb': os.path.getsize(os.path.join(index_dir, INDEX_FILE)) / 2**20}
+    for name, shared in (('copy', False), ('shared', True)):
+        rows, _ = _run_workers(args, cache_dir, shared, workers, queries)
+        results[name] = {
+            'rss_before_mb': sum(r['before']['rss'] for r in rows) / workers,
+            'rss_mb': sum(r['rss'] for r in rows) / workers,
+            'pss_mb': sum(r['pss'] for r in rows) / workers,
+            'shared_mb': sum(r['shared'] for r in rows) / workers,
+            'total_pss_mb': sum(r['pss'] for r in rows),
+        }
+
+    print(f"\n=== Süreç belleği ({workers} süreç aynı anda, index dosyası {results['index_mb']:.1f} MB) ===")
+    for name, label in (('copy', 'kopya'), ('shared', 'paylaşımlı')):
+        row = results[name]
+        print(
+            f" {label:<11} RSS kurulum öncesi {row['rss_before_mb']:.0f} MB -> {row['rss_mb']:.0f} MB  "
+            f"PSS {row['pss_mb']:.0f} MB  paylaşılan {row['shared_mb']:.0f} MB  toplam PSS {row['total_pss_mb']:.0f} MB"
+        )
+    saved = results['copy']['total_pss_mb'] - results['shared']['total_pss_mb']
+    print(f" Paylaşımlı modda toplam bellek farkı: {-saved:+.0f} MB")
+    return results
+
+
+def faiss_search(index, vectors, k):
+    return index.search(np.ascontiguousarray(vectors, dtype=np.float32), k)
+
+
+def _ms(stats):
+    return "  ".join(f"{k}={stats[k] * 1000:.1f}ms" for k in ('mean', 'p50', 'p95', 'p99'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FinancialChatbot benchmark")
+    parser.add_argument('--data', default='data/all_qa_data.json')
+    parser.add_argument('--index-mode', default='full')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--llm-delay', type=float, default=0.3, help="FakeLLM gecikmesi (sn)")
+    parser.add_argument('--llm-timeout', type=float, default=LLM_TIMEOUT,
+                        help="LLM süre sınırı (sn); aşılırsa kayıtlı cevaba düşülür")
+    parser.add_argument('--hedge-after', type=float, help="Bu kadar saniyede cevap gelmezse ikinci istek")
+    parser.add_argument('--concurrency', default='1,4,16')
+    parser.add_argument('--embed-workers', type=int, default=1,
+                        help="Index kurulumunda embedding için süreç sayısı")
+    parser.add_argument('--embed-batch-size', type=int, default=BUILD_BATCH_SIZE,
+                        help="Index'e bir seferde eklenen döküman sayısı")
+    parser.add_argument('--compare-embeddings', help="Karşılaştırılacak backend'ler, ör. torch,onnx,onnx-int8")
+    parser.add_argument('--index-config', action='append',
+                        help="FAISS index tanımı ve arama parametreleri, ör. 'IVF64,Flat nprobe=8' (tekrarlanabilir)")
+    parser.add_argument('--shared-memory', type=int, metavar='N',
+                        help="N süreçte index kopyalı ve mmap ile paylaşımlı modun RSS/PSS karşılaştırması")
+    parser.add_argument('--output', help="Sonuçların yazılacağı JSON dosyası")
+    args = parser.parse_args()
+
+    queries = load_queries(args.data, args.queries)
+    if args.compare_embeddings:
+        results = {'embeddings': compare_embeddings(args, args.compare_embeddings.split(','), queries)}
+        _save(results, args.output)
+        return
+
+    cache_dir = tempfile.mkdtemp(prefix='bench_index_')
+    results = {'args': vars(args), 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    try:
+        if args.shared_memory:
+            results['shared_memory'] = measure_shared_memory(args, cache_dir, args.shared_memory, queries[:20])
+            _save(results, args.output)
+            return
+        _, results['cold_start'] = build_bot(args, cache_dir)
+        bot, results['warm_start'] = build_bot(args, cache_dir)
+        if args.index_config:
+            results['index_configs'] = compare_index_configs(bot, args.index_config, queries)
+            _save(results, args.output)
+            return
+
+        results['retrieval'] = bench_retrieval(bot, queries)
+        results['ask'] = bench_ask(bot, queries)
+        results['throughput'] = [
+            bench_throughput(bot, queries, int(c)) for c in args.concurrency.split(',')
+        ]
+        results['llm'] = bot.stats()['llm']
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+    print("\n=== Açılış (sn) ===")
+    for name in ('cold_start', 'warm_start'):
+        phases = "  ".join(f"{k}={v:.2f}" for k, v in results[name].items())
+        print(f" {name:<10} {phases}")
+    print("\n=== Retrieval ===")
+    for stage, stats in results['retrieval'].items():
+        print(f" {stage:<10} {_ms(stats)}")
+    print("\n=== ask (uçtan uca) ===")
+    print(f" {'sıralı':<10} {_ms(results['ask'])}")
+    print("\n=== Verim ===")
+    for row in results['throughput']:
+        print(f" N={row['concurrency']:<8} {row['rps']:.1f} istek/sn  {_ms(row['latency'])}")
+    llm = results['llm']
+    print(f"\n LLM: {llm['timeouts']} zaman aşımı, {llm['fallbacks']} kayıtlı cevap, {llm['hedged']} hedge "
+          f"({llm['hedge_wins']} kazandı, {llm['hedge_skipped']} atlandı), {llm['retries']} tekrar")
+
+    _save(results, args.output)
+
+
+def _save(results, path):
+    if not path:
+        return
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n Sonuçlar {path} dosyasına kaydedildi")
+
+
+if __name__ == "__main__":
+    main()
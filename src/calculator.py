@@ -0,0 +1,141 @@
+"""Araçlar sekmesi için kapalı form ve NumPy ile vektörize finansal hesaplar.
+
+Tüm fonksiyonlar skaler veya dizi girdi kabul eder; diziler NumPy yayınlama
+(broadcasting) kurallarıyla birleşir. Böylece tek çağrıda binlerce faiz/ödeme
+kombinasyonu hesaplanabilir. Oranlar ondalık verilir (aylık %2,5 -> 0.025).
+"""
+import numpy as np
+
+# Eski aylık simülasyonun üst sınırı (100 yıl)
+MAX_MONTHS = 1200
+# Mevduat faizi stopaj oranı
+STOPAJ = 0.15
+DAYS_IN_YEAR = 365
+# log oranlarındaki yuvarlama hatası tam ay sayısını bir sonraki aya taşımasın
+_EPS = 1e-9
+
+
+def _ceil_months(months):
+    return np.ceil(np.asarray(months, dtype=float) - _EPS)
+
+
+def savings_months(target, monthly, rate):
+    """Her ay sonunda `monthly` yatırılan ve aylık `rate` getiri alan birikimin
+    `target` tutara ulaştığı ay sayısı.
+
+    n = ceil(log(FV·r/P + 1) / log(1 + r)); r = 0 için ceil(FV / P).
+    Hedefe MAX_MONTHS içinde ulaşılamıyorsa MAX_MONTHS döner.
+    """
+    target, monthly, rate = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (target, monthly, rate)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = np.log1p(target * rate / monthly) / np.log1p(rate)
+        months = np.where(rate > 0, growth, target / monthly)
+    months = np.where(target <= 0, 0.0, months)
+    months = np.where(np.isfinite(months), _ceil_months(months), MAX_MONTHS)
+    return np.minimum(months, MAX_MONTHS).astype(int)
+
+
+def savings_balance(monthly, rate, months):
+    """`months` ay sonundaki birikim: P·((1 + r)^n − 1) / r"""
+    monthly, rate, months = (np.asarray(x, dtype=float) for x in (monthly, rate, months))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        grown = monthly * np.expm1(months * np.log1p(rate)) / rate
+    return np.where(rate > 0, grown, monthly * months)
+
+
+def debt_payoff_months(balance, payment, rate):
+    """Aylık `rate` faizli `balance` borcun sabit `payment` ile kapanma süresi (ay).
+
+    n = ceil(log(P / (P − B·r)) / log(1 + r)); r = 0 için ceil(B / P).
+    Ödeme aylık faizi karşılamıyorsa borç hiç kapanmaz ve np.inf döner.
+    """
+    balance, payment, rate = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in (balance, payment, rate)))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exact = np.where(
+            rate > 0,
+            -np.log1p(-balance * rate / payment) / np.log1p(rate),
+            balance / payment,
+        )
+    never = (payment <= balance * rate) | (payment <= 0)
+    months = np.where(never, np.inf, _ceil_months(exact))
+    return np.where(balance <= 0, 0.0, months)
+
+
+def remaining_balance(balance, payment, rate, months):
+    """`months` ödemeden sonra kalan borç: B·(1 + r)^k − P·((1 + r)^k − 1) / r"""
+    balance, payment, rate, months = (np.asarray(x, dtype=float) for x in (balance, payment, rate, months))
+    growth = np.exp(months * np.log1p(rate))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        paid = np.where(rate > 0, payment * np.expm1(months * np.log1p(rate)) / rate, payment * months)
+    return balance * growth - paid
+
+
+def debt_total_interest(balance, payment, rate):
+    """Borç kapanana kadar ödenen toplam faiz; son ödeme kalan tutar kadardır.
+
+    Borç kapanmıyorsa np.inf döner.
+    """
+    months = debt_payoff_months(balance, payment, rate)
+    finite = np.isfinite(months) & (months > 0)
+    full = np.where(finite, months - 1, 0)
+    last = remaining_balance(balance, payment, rate, full) * (1 + np.asarray(rate, dtype=float))
+    total = np.where(finite, full * payment + last - balance, 0.0)
+    return np.where(np.isfinite(months), total, np.inf)
+
+
+def annuity_payment(principal, rate, months):
+    """Eşit taksitli kredinin aylık taksiti: B·r / (1 − (1 + r)^−n)"""
+    principal, rate, months = (np.asarray(x, dtype=float) for x in (principal, rate, months))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        payment = principal * rate / -np.expm1(-months * np.log1p(rate))
+    return np.where(rate > 0, payment, principal / months)
+
+
+def amortization_schedule(balance, payment, rate, max_months=MAX_MONTHS):
+    """Sabit ödemeli borcun ay ay ödeme planı.
+
+    {'month', 'payment', 'interest', 'principal', 'balance'} dizileri döndürür;
+    son ödeme kalan borç kadardır. Borç kapanmıyorsa `max_months` ay gösterilir.
+    """
+    months = float(debt_payoff_months(balance, payment, rate))
+    n = int(min(months, max_months)) if np.isfinite(months) else max_months
+    k = np.arange(1, n + 1)
+    opening = remaining_balance(balance, payment, rate, k - 1)
+    interest = opening * rate
+    payments = np.full(n, float(payment))
+    if np.isfinite(months) and n == months and n > 0:
+        payments[-1] = opening[-1] + interest[-1]
+    principal = payments - interest
+    closing = opening - principal
+    return {
+        'month': k,
+        'payment': payments,
+        'interest': interest,
+        'principal': principal,
+        'balance': np.maximum(closing, 0.0),
+    }
+
+
+def deposit_net_return(principal, annual_rate, days, stopaj=STOPAJ):
+    """Vadeli mevduatın stopaj sonrası net faiz getirisi (basit faiz, 365 gün).
+
+    brüt = anapara · yıllık oran · gün / 365, net = brüt · (1 − stopaj)
+    """
+    principal, annual_rate, days, stopaj = (np.asarray(x, dtype=float) for x in (principal, annual_rate, days, stopaj))
+    gross = principal * annual_rate * days / DAYS_IN_YEAR
+    return gross * (1 - stopaj)
+
+
+def sweep(func, rows, cols, **fixed):
+    """func'u iki parametrenin tüm kombinasyonları için tek çağrıda hesaplar.
+
+    rows ve cols {'parametre adı': değerler} biçimindedir; sonuç
+    (len(rows değerleri), len(cols değerleri)) boyutlu bir dizidir.
+    Örnek: sweep(savings_months, {'monthly': odemeler}, {'rate': oranlar}, target=60000)
+    """
+    (row_name, row_values), = rows.items()
+    (col_name, col_values), = cols.items()
+    kwargs = dict(fixed)
+    kwargs[row_name] = np.asarray(row_values, dtype=float)[:, None]
+    kwargs[col_name] = np.asarray(col_values, dtype=float)[None, :]
+    return func(**kwargs)
@@ -0,0 +1,90 @@
+import codecs
+import http.client
+import json
+from urllib.parse import urlsplit
+
+# Sunucu tarafındaki REQUEST_TIMEOUT'tan biraz uzun; sunucu önce 504 döner
+CLIENT_TIMEOUT = 60.0
+
+
+class RemoteChatbot:
+    """server.py ile çalışan bir FinancialChatbot'a HTTP üzerinden bağlanır.
+
+    app.py'nin kullandığı arayüzün (ask, ask_stream, stats, warm_up) aynısını
+    sunar; böylece Streamlit, modeli ve index'i kendi sürecinde yüklemeden
+    ısınmış tek bir sunucu sürecini paylaşabilir.
+    """
+
+    def __init__(self, url, timeout=CLIENT_TIMEOUT):
+        parts = urlsplit(url)
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port
+        self.https = parts.scheme == 'https'
+        self.timeout = timeout
+
+    def _request(self, method, path, payload=None):
+        """(bağlantı, cevap) döndürür; sunucu her istekten sonra bağlantıyı
+        kapattığı için bağlantı cevap okunduktan sonra kapatılmalıdır"""
+        cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=self.timeout)
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body else {}
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            return conn, conn.getresponse()
+        except Exception:
+            conn.close()
+            raise
+
+    def _json(self, method, path, payload=None):
+        conn, response = self._request(method, path, payload)
+        try:
+            data = json.loads(response.read() or b'{}')
+        finally:
+            conn.close()
+        if response.status != 200:
+            raise RuntimeError(data.get('error') or f"HTTP {response.status}")
+        return data
+
+    def health(self):
+        """Sunucu ayaktaysa durum sözlüğünü döndürür, değilse hata fırlatır"""
+        return self._json('GET', '/health')
+
+    def stats(self):
+        return self._json('GET', '/stats')
+
+    def ask(self, question, filter=None):
+        """Soru sor ve cevap al; filter FinancialChatbot.ask'teki gibidir"""
+        try:
+            return self._json('POST', '/ask', {'question': question, 'filter': filter})['answer']
+        except Exception as e:
+            return f" Hata oluştu: {str(e)}"
+
+    def ask_stream(self, question, filter=None):
+        """Cevabı sunucudan geldikçe parça parça döndüren generator"""
+        conn = None
+        try:
+            conn, response = self._request('POST', '/ask', {'question': question, 'stream': True, 'filter': filter})
+            if response.status != 200:
+                data = json.loads(response.read() or b'{}')
+                raise RuntimeError(data.get('error') or f"HTTP {response.status}")
+            # Çok baytlı karakterler parça sınırında bölünebilir
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            while True:
+                chunk = response.read1(8192)
+                if not chunk:
+                    break
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+        except Exception as e:
+            yield f" Hata oluştu: {str(e)}"
+        finally:
+            # Akış yarıda bırakılsa da (generator kapatılınca) bağlantı kapanır
+            if conn is not None:
+                conn.close()
+
+    def warm_up(self, prompts, refresh_interval=None):
+        """Hazır cevapları sunucu sürecinde hesaplatır (bkz. FinancialChatbot.warm_up)"""
+        self._json('POST', '/warm_up', {'prompts': list(prompts), 'refresh_interval': refresh_interval})
@@ -0,0 +1,91 @@
+import re
+
+from lexical import tokenize
+
+# Prompt'a girecek bağlam için varsayılan token bütçesi
+CONTEXT_TOKEN_BUDGET = 400
+# Soru metinlerinden (uzun çağrı merkezi konuşmaları olabilir) tutulacak en fazla cümle
+MAX_QUESTION_SENTENCES = 2
+# Kelime kümeleri bu oranda örtüşen pasajlar tekrar sayılır
+DUPLICATE_OVERLAP = 0.8
+_SENTENCE_RE = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+def estimate_tokens(text):
+    """Yaklaşık token sayısı (~4 karakter / token); tokenizer gerektirmez"""
+    return (len(text) + 3) // 4
+
+
+def split_sentences(text):
+    return [s.strip() for s in _SENTENCE_RE.split(text) if s.strip()]
+
+
+def _overlap(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / min(len(a), len(b))
+
+
+class ContextAssembler:
+    """Retrieval sonuçlarından token bütçesine sığan kısa bir bağlam üretir.
+
+    Aynı cevabı veya büyük ölçüde örtüşen metni taşıyan pasajlar bir kez
+    alınır; soru metinleri kullanıcının sorusuyla en çok ortak terimi olan
+    cümlelere indirilir; kategori ve kaynak gibi alanlar prompt'a girmez.
+    Bütçe dolduğunda kalan pasajlar, son pasajın cevabı da en alakalı
+    cümlelerine kırpılarak atlanır.
+    """
+
+    def __init__(self, budget=CONTEXT_TOKEN_BUDGET, max_question_sentences=MAX_QUESTION_SENTENCES,
+                 duplicate_overlap=DUPLICATE_OVERLAP):
+        self.budget = budget
+        self.max_question_sentences = max_question_sentences
+        self.duplicate_overlap = duplicate_overlap
+
+    @staticmethod
+    def _relevant(sentences, query_terms, limit):
+        """Sorguyla en çok ortak terimi olan `limit` cümleyi özgün sıralarıyla döndürür"""
+        if len(sentences) <= limit:
+            return sentences
+        scored = sorted(
+            range(len(sentences)),
+            key=lambda i: (-len(query_terms & set(tokenize(sentences[i]))), i)
+        )
+        return [sentences[i] for i in sorted(scored[:limit])]
+
+    def _fit(self, question, answer, query_terms, budget):
+        """Pasajı bütçeye sığacak şekilde cevap cümlelerini azaltarak biçimler"""
+        sentences = split_sentences(answer)
+        for limit in range(len(sentences), 0, -1):
+            text = f"Soru: {question}\nCevap: {' '.join(self._relevant(sentences, query_terms, limit))}"
+            if estimate_tokens(text) <= budget:
+                return text
+        return None
+
+    def assemble(self, question, passages):
+        """passages: sıralı (soru, cevap) çiftleri.
+
+        (bağlam metni, {'passages', 'dropped', 'context_tokens'}) döndürür.
+        """
+        query_terms = set(tokenize(question))
+        blocks, seen, dropped = [], [], 0
+        remaining = self.budget
+        for passage_question, answer in passages:
+            passage_question = passage_question or ""
+            terms = set(tokenize(answer))
+            if any(_overlap(terms, other) >= self.duplicate_overlap for other in seen):
+                dropped += 1
+                continue
+            short_question = " ".join(self._relevant(
+                split_sentences(passage_question), query_terms, self.max_question_sentences
+            ))
+            block = self._fit(short_question, answer, query_terms, remaining)
+            if block is None:
+                dropped += 1
+                continue
+            seen.append(terms)
+            blocks.append(block)
+            # Bloklar arasındaki boş satır da bütçeden düşülür
+            remaining -= estimate_tokens(block) + 1
+        context = "\n\n".join(blocks)
+        return context, {'passages': len(blocks), 'dropped': dropped, 'context_tokens': estimate_tokens(context)}
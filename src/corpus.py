@@ -0,0 +1,144 @@
+import json
+import os
+import threading
+
+import numpy as np
+from langchain.docstore.base import AddableMixin, Docstore
+from langchain.schema import Document
+
+# Her satır tek bir kayıt; yanındaki .idx dosyası satır başlarının bayt ofsetleridir
+OFFSETS_SUFFIX = '.idx'
+
+
+def resolve_corpus_path(path):
+    """Eski .json yolu verilmişse ve yanında .jsonl varsa onu tercih eder"""
+    root, ext = os.path.splitext(path)
+    if ext == '.json' and os.path.exists(root + '.jsonl'):
+        return root + '.jsonl'
+    return path
+
+
+def write_jsonl(path, record_batches):
+    """Kayıt partilerini sıkıştırılmış JSONL olarak yazar ve ofset index'ini üretir.
+
+    Her iki dosya da önce geçici olarak yazılır ve yerine taşınır; yazılan
+    kayıt sayısını döndürür.
+    """
+    offsets = [0]
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        for batch in record_batches:
+            for record in batch:
+                f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8') + b'\n')
+                offsets.append(f.tell())
+    _save_offsets(path, offsets)
+    os.replace(tmp_path, path)
+    return len(offsets) - 1
+
+
+def _save_offsets(path, offsets):
+    tmp_path = path + OFFSETS_SUFFIX + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        np.save(f, np.asarray(offsets, dtype=np.int64))
+    os.replace(tmp_path, path + OFFSETS_SUFFIX)
+
+
+def iter_records(path):
+    """Kayıtları sırayla döndürür; JSONL dosyası satır satır okunur"""
+    if not path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+    with open(path, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+class CorpusStore:
+    """Kayıtlara sıra numarasıyla tembel erişim.
+
+    JSONL dosyalarında yalnızca ofset tablosu (mmap ile) bellekte tutulur ve
+    her kayıt istendiğinde diskten okunur. Ofset index'i yoksa veya dosyayla
+    uyuşmuyorsa tek geçişte yeniden oluşturulur. Eski .json dizileri için
+    kayıtlar belleğe yüklenir.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._records = None
+        self._lock = threading.Lock()
+        self._file = None
+        if not path.endswith('.jsonl'):
+            self._records = list(iter_records(path))
+            return
+        offsets_path = path + OFFSETS_SUFFIX
+        size = os.path.getsize(path)
+        offsets = np.load(offsets_path, mmap_mode='r') if os.path.exists(offsets_path) else None
+        if offsets is None or offsets[-1] != size:
+            print(" Ofset index'i oluşturuluyor...")
+            _save_offsets(path, self._scan_offsets(path))
+            offsets = np.load(offsets_path, mmap_mode='r')
+        self.offsets = offsets
+
+    @staticmethod
+    def _scan_offsets(path):
+        offsets = [0]
+        with open(path, 'rb') as f:
+            for _ in iter(f.readline, b''):
+                offsets.append(f.tell())
+        return offsets
+
+    def __len__(self):
+        if self._records is not None:
+            return len(self._records)
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        if self._records is not None:
+            return iter(self._records)
+        return iter_records(self.path)
+
+    def get(self, row):
+        """row numaralı kaydı döndürür"""
+        if self._records is not None:
+            return self._records[row]
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, 'rb')
+            self._file.seek(start)
+            line = self._file.read(end - start)
+        return json.loads(line)
+
+
+class CorpusDocstore(Docstore, AddableMixin):
+    """FAISS için döküman metinlerini bellekte tutmayan docstore.
+
+    Döküman kimliği -> kayıt sırası eşlemesi tutulur; `search` kaydı
+    CorpusStore'dan okuyup `format_document` ile Document'a çevirir ve kayıt
+    sırasını metadata'ya ('row') ekler.
+    `add` metinleri saklamaz, çünkü içerik zaten corpus dosyasındadır.
+    """
+
+    def __init__(self, store, doc_rows, format_document):
+        self.store = store
+        self.doc_rows = doc_rows
+        self.format_document = format_document
+
+    def search(self, search):
+        row = self.doc_rows.get(search)
+        if row is None:
+            return f"ID {search} not found."
+        text, metadata = self.format_document(self.store.get(row))
+        return Document(page_content=text, metadata=dict(metadata, row=row))
+
+    def add(self, texts):
+        missing = [doc_id for doc_id in texts if doc_id not in self.doc_rows]
+        if missing:
+            raise ValueError(f"Corpus'ta olmayan dökümanlar eklenemez: {missing[:3]}")
+
+    def delete(self, ids):
+        # Silinen kayıtlar zaten corpus'ta yok; eşleme açılışta yeniden kurulur
+        for doc_id in ids:
+            self.doc_rows.pop(doc_id, None)
@@ -1,79 +1,128 @@
-import pandas as pd
-from datasets import load_dataset
+import argparse
 import json
 import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from datasets import load_dataset
+
+from corpus import write_jsonl
+
+DATASET_NAME = "talkmap/banking-conversation-corpus"
+OUTPUT_PATH = 'data/all_qa_data.jsonl'
+CHUNK_SIZE = 10000
+
+# Örnek bankacılık cevapları (Türkçe)
+BANKING_ANSWERS = {
+    "card": "Kart işleminiz için size yardımcı olabilirim. Kredi kartı veya banka kartı ile ilgili sorunlarınızı çözebiliriz. Lütfen kartınızla ilgili detaylı bilgi verin.",
+    "account": "Hesap işlemleriniz için buradayım. Hesap açma, kapatma, bakiye sorgulama gibi işlemlerde yardımcı olabilirim.",
+    "transfer": "Para transferi işleminizi gerçekleştirebiliriz. Havale, EFT veya FAST işlemleriniz için destek sağlayabilirim.",
+    "payment": "Ödeme işlemlerinizde size yardımcı olabilirim. Fatura, kredi kartı veya diğer ödemelerinizi yapabilirsiniz.",
+    "loan": "Kredi başvurunuz veya mevcut kredinizle ilgili destek verebilirim. Detaylı bilgi için müşteri temsilcimize bağlanabilirsiniz.",
+    "atm": "ATM işlemlerinizle ilgili yardımcı olabilirim. Para çekme, yatırma veya ATM sorunlarınızı çözebiliriz.",
+    "online": "Online bankacılık işlemlerinizde size destek olabilirim. Şifre, giriş veya uygulama sorunlarınızı çözebilirim.",
+    "balance": "Bakiye sorgulamanızda yardımcı olabilirim. Hesap veya kart bakiyenizi öğrenebilirsiniz.",
+    "pin": "PIN/şifre işlemlerinizde destek sağlayabilirim. Şifre yenileme veya unutma durumlarında yardımcı olabilirim.",
+    "default": "Bankacılık işleminizde size yardımcı olmak için buradayım. Lütfen sorunuzu daha detaylı anlatın."
+}
+
+# Kategori bazlı anahtar kelimeler; sıra önceliktir (ilk eşleşen kazanır)
+CATEGORY_KEYWORDS = [
+    ("card", ["card", "credit", "kart"]),
+    ("account", ["account", "hesap"]),
+    ("transfer", ["transfer", "havale", "eft"]),
+    ("payment", ["payment", "ödeme", "fatura"]),
+    ("loan", ["loan", "kredi"]),
+    ("atm", ["atm"]),
+    ("online", ["online", "app", "uygulama"]),
+    ("balance", ["balance", "bakiye"]),
+    ("pin", ["pin", "password", "şifre"]),
+]
+_CATEGORY_KEYS = [key for key, _ in CATEGORY_KEYWORDS]
+# Alt dize eşleşmesi: eski `'kart' in text` kontrolleriyle aynı sonuç
+_CATEGORY_PATTERNS = ["|".join(words) for _, words in CATEGORY_KEYWORDS]
+
+
+def classify_texts(texts):
+    """Metinleri anahtar kelimelere göre vektörel olarak sınıflandırır, cevap anahtarlarını döndürür"""
+    lowered = pd.Series(texts, dtype=object).astype(str).str.lower()
+    conditions = [lowered.str.contains(pattern, regex=True).to_numpy() for pattern in _CATEGORY_PATTERNS]
+    return np.select(conditions, _CATEGORY_KEYS, default="default")
+
 
-def prepare_banking_data():
+def _chunk_to_qa(texts):
+    """Bir metin parçasını Q&A kayıtlarına çevirir (süreç havuzunda da çalışır)"""
+    keys = classify_texts(texts)
+    return [
+        {
+            "question": text,
+            "answer": BANKING_ANSWERS[key],
+            "category": "banking",
+            "source": "banking_corpus"
+        }
+        for text, key in zip(texts, keys)
+    ]
+
+
+def iter_banking_texts(limit=1000, chunk_size=CHUNK_SIZE):
+    """Dataset'i indirmeden, parça parça okuyarak 'text' listeleri üretir.
+
+    limit=None tüm veri setini okur.
     """
-    talkmap/banking-conversation-corpus dataset'inden ilk 1000 kaydı alır,
+    dataset = load_dataset(DATASET_NAME, split="train", streaming=True)
+    remaining = limit
+    for batch in dataset.iter(batch_size=chunk_size):
+        texts = batch["text"]
+        if remaining is not None:
+            texts = texts[:remaining]
+            remaining -= len(texts)
+        if texts:
+            yield texts
+        if remaining == 0:
+            break
+
+
+def iter_banking_qa(limit=1000, chunk_size=CHUNK_SIZE, workers=None):
+    """Bankacılık Q&A kayıtlarını parça parça üretir.
+
+    workers > 1 ise sınıflandırma bir süreç havuzunda yapılır; bellekte en
+    fazla 2 * workers parça bekletilir.
+    """
+    chunks = iter_banking_texts(limit, chunk_size)
+    if not workers or workers <= 1:
+        for texts in chunks:
+            yield _chunk_to_qa(texts)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for texts in chunks:
+            pending.append(pool.submit(_chunk_to_qa, texts))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def prepare_banking_data(limit=1000, chunk_size=CHUNK_SIZE, workers=None):
+    """
+    talkmap/banking-conversation-corpus dataset'inden ilk `limit` kaydı alır,
     anahtar kelimelere göre Türkçe bankacılık cevapları ile Q&A formatına çevirir ve döndürür.
     """
     print(" Banking dataset indiriliyor...")
     
+    qa_pairs = []
     try:
-        # Dataset'i yükle
         # Not: Bu adım internet bağlantısı gerektirir ve biraz zaman alabilir.
-        dataset = load_dataset("talkmap/banking-conversation-corpus")
-        
-        # İlk 1000 satırı al (veya daha azı varsa tamamını)
-        df = pd.DataFrame(dataset['train'][:1000])
-        
-        print(f" {len(df)} konuşma yüklendi")
-        
+        for batch in iter_banking_qa(limit, chunk_size, workers):
+            qa_pairs.extend(batch)
     except Exception as e:
         print(f"Hata: Banking dataset yüklenemedi. ({e}) Boş veri döndürülüyor.")
         return []
 
-    qa_pairs = []
-
-    # Örnek bankacılık cevapları (Türkçe)
-    banking_answers = {
-        "card": "Kart işleminiz için size yardımcı olabilirim. Kredi kartı veya banka kartı ile ilgili sorunlarınızı çözebiliriz. Lütfen kartınızla ilgili detaylı bilgi verin.",
-        "account": "Hesap işlemleriniz için buradayım. Hesap açma, kapatma, bakiye sorgulama gibi işlemlerde yardımcı olabilirim.",
-        "transfer": "Para transferi işleminizi gerçekleştirebiliriz. Havale, EFT veya FAST işlemleriniz için destek sağlayabilirim.",
-        "payment": "Ödeme işlemlerinizde size yardımcı olabilirim. Fatura, kredi kartı veya diğer ödemelerinizi yapabilirsiniz.",
-        "loan": "Kredi başvurunuz veya mevcut kredinizle ilgili destek verebilirim. Detaylı bilgi için müşteri temsilcimize bağlanabilirsiniz.",
-        "atm": "ATM işlemlerinizle ilgili yardımcı olabilirim. Para çekme, yatırma veya ATM sorunlarınızı çözebiliriz.",
-        "online": "Online bankacılık işlemlerinizde size destek olabilirim. Şifre, giriş veya uygulama sorunlarınızı çözebilirim.",
-        "balance": "Bakiye sorgulamanızda yardımcı olabilirim. Hesap veya kart bakiyenizi öğrenebilirsiniz.",
-        "pin": "PIN/şifre işlemlerinizde destek sağlayabilirim. Şifre yenileme veya unutma durumlarında yardımcı olabilirim.",
-        "default": "Bankacılık işleminizde size yardımcı olmak için buradayım. Lütfen sorunuzu daha detaylı anlatın."
-    }
-
-    # Q&A formatına çevir
-    for _, row in df.iterrows():
-        # 'text' sütununun string olduğundan emin ol
-        text = str(row['text']).lower() 
-        
-        # Kategori bazlı Türkçe cevap seç
-        if 'card' in text or 'credit' in text or 'kart' in text:
-            answer = banking_answers['card']
-        elif 'account' in text or 'hesap' in text:
-            answer = banking_answers['account']
-        elif 'transfer' in text or 'havale' in text or 'eft' in text:
-            answer = banking_answers['transfer']
-        elif 'payment' in text or 'ödeme' in text or 'fatura' in text:
-            answer = banking_answers['payment']
-        elif 'loan' in text or 'kredi' in text:
-            answer = banking_answers['loan']
-        elif 'atm' in text:
-            answer = banking_answers['atm']
-        elif 'online' in text or 'app' in text or 'uygulama' in text:
-            answer = banking_answers['online']
-        elif 'balance' in text or 'bakiye' in text:
-            answer = banking_answers['balance']
-        elif 'pin' in text or 'password' in text or 'şifre' in text:
-            answer = banking_answers['pin']
-        else:
-            answer = banking_answers['default']
-        
-        qa_pairs.append({
-            "question": row['text'],
-            "answer": answer,
-            "category": "banking",
-            "source": "banking_corpus"
-        })
-    
+    print(f" {len(qa_pairs)} konuşma yüklendi")
     return qa_pairs
 
 def prepare_financial_literacy_data():
@@ -146,29 +195,73 @@ def prepare_financial_literacy_data():
     print(f" {len(financial_qa)} finansal eğitim verisi eklendi")
     return financial_qa
 
-def save_all_data():
-    """Tüm bankacılık ve finansal okur yazarlık verilerini birleştirir ve JSON dosyasına kaydeder."""
+class JsonArrayWriter:
+    """Kayıtları parti parti yazarak json.dump(..., indent=2) ile aynı çıktıyı üretir"""
+
+    def __init__(self, f):
+        self.f = f
+        self.count = 0
+
+    def write_batch(self, records):
+        for record in records:
+            item = json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            self.f.write(("[\n  " if self.count == 0 else ",\n  ") + item)
+            self.count += 1
+        return len(records)
+
+    def close(self):
+        self.f.write("\n]" if self.count else "[]")
+
+
+def save_all_data(output_path=OUTPUT_PATH, limit=1000, chunk_size=CHUNK_SIZE, workers=None):
+    """Tüm bankacılık ve finansal okur yazarlık verilerini birleştirir ve kaydeder.
+
+    Varsayılan çıktı satır başına bir kayıt içeren JSONL ve yanındaki ofset
+    index'idir (.jsonl.idx); yol .json ile bitiyorsa eski JSON dizisi yazılır.
+    Bankacılık verisi parça parça okunup sınıflandırılır ve dosyaya partiler
+    halinde yazılır; bellek kullanımı veri seti boyutundan bağımsızdır.
+    """
     print(" Veriler birleştiriliyor...")
     
-    # İki veri setini al
-    banking_data = prepare_banking_data()
-    financial_data = prepare_financial_literacy_data()
-    
-    # Birleştir
-    all_data = banking_data + financial_data
-    
-    # Kaydet
-    output_path = 'data/all_qa_data.json'
     # Klasör yoksa oluştur
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     
-    # JSON olarak kaydet
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(all_data, f, ensure_ascii=False, indent=2)
+    counts = {'banking': 0, 'financial': 0}
+
+    def batches():
+        print(" Banking dataset indiriliyor...")
+        try:
+            for batch in iter_banking_qa(limit, chunk_size, workers):
+                counts['banking'] += len(batch)
+                print(f" {counts['banking']} konuşma işlendi", end="\r")
+                yield batch
+        except Exception as e:
+            print(f"Hata: Banking dataset yüklenemedi. ({e}) Bankacılık verisi eksik kalabilir.")
+        financial = prepare_financial_literacy_data()
+        counts['financial'] = len(financial)
+        yield financial
+
+    if output_path.endswith('.jsonl'):
+        write_jsonl(output_path, batches())
+    else:
+        # Geçici dosyaya yaz, bitince yer değiştir (chatbot yarım dosya okumasın)
+        tmp_path = output_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            writer = JsonArrayWriter(f)
+            for batch in batches():
+                writer.write_batch(batch)
+            writer.close()
+        os.replace(tmp_path, output_path)
     
-    print(f"\n Toplam {len(all_data)} veri {output_path} dosyasına kaydedildi!")
-    print(f"   - Bankacılık Konuşmaları: {len(banking_data)} adet")
-    print(f"   - Finansal Okur Yazarlık: {len(financial_data)} adet")
+    print(f"\n Toplam {counts['banking'] + counts['financial']} veri {output_path} dosyasına kaydedildi!")
+    print(f"   - Bankacılık Konuşmaları: {counts['banking']} adet")
+    print(f"   - Finansal Okur Yazarlık: {counts['financial']} adet")
 
 if __name__ == "__main__":
-    save_all_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Q&A verisini hazırlar")
+    parser.add_argument('--limit', type=int, default=1000, help="Bankacılık kaydı sayısı (0: tümü)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=None, help="Sınıflandırma için süreç sayısı")
+    parser.add_argument('--output', default=OUTPUT_PATH)
+    args = parser.parse_args()
+    save_all_data(args.output, args.limit or None, args.chunk_size, args.workers)
@@ -0,0 +1,166 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import numpy as np
+from langchain.embeddings import HuggingFaceEmbeddings
+from langchain_core.embeddings import Embeddings
+
+EMBEDDING_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+EMBEDDING_BACKENDS = ('torch', 'onnx', 'onnx-int8')
+ONNX_CACHE_DIR = 'data/onnx'
+EMBED_BATCH_SIZE = 32
+# Index kurulumunda bir seferde embed edilip index'e eklenen döküman sayısı
+BUILD_BATCH_SIZE = 1024
+
+
+class OnnxEmbeddings(Embeddings):
+    """Aynı sentence-transformers modelini ONNX Runtime ile CPU'da çalıştırır.
+
+    Model ilk kullanımda optimum ile ONNX'e çevrilir ve `cache_dir` altına
+    kaydedilir; `quantize=True` ise ağırlıklar dinamik olarak int8'e indirgenir.
+    Çalışma anında torch gerekmez. Çıktı, sentence-transformers'taki gibi
+    attention mask ile ağırlıklı ortalama (mean pooling) vektörüdür.
+    """
+
+    def __init__(self, model_name=EMBEDDING_MODEL, quantize=False, batch_size=EMBED_BATCH_SIZE,
+                 cache_dir=ONNX_CACHE_DIR, max_length=128):
+        try:
+            import onnxruntime as ort
+            from transformers import AutoTokenizer
+        except ImportError as e:
+            raise ImportError(
+                "ONNX embedding backend için 'pip install onnxruntime optimum[onnxruntime]' gerekli"
+            ) from e
+
+        self.batch_size = batch_size
+        self.max_length = max_length
+        model_dir = os.path.join(cache_dir, model_name.replace('/', '__'))
+        model_path = os.path.join(model_dir, 'model.onnx')
+        if not os.path.exists(model_path):
+            self._export(model_name, model_dir)
+        if quantize:
+            quantized_path = os.path.join(model_dir, 'model_int8.onnx')
+            if not os.path.exists(quantized_path):
+                from onnxruntime.quantization import QuantType, quantize_dynamic
+
+                print(" ONNX modeli int8'e indirgeniyor...")
+                quantize_dynamic(model_path, quantized_path, weight_type=QuantType.QInt8)
+            model_path = quantized_path
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(model_path, providers=['CPUExecutionProvider'])
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    @staticmethod
+    def _export(model_name, model_dir):
+        from optimum.onnxruntime import ORTModelForFeatureExtraction
+        from transformers import AutoTokenizer
+
+        print(f" {model_name} ONNX formatına çevriliyor (tek seferlik)...")
+        model = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+        model.save_pretrained(model_dir)
+        AutoTokenizer.from_pretrained(model_name).save_pretrained(model_dir)
+
+    def _encode(self, texts):
+        # Benzer uzunluktaki metinleri aynı batch'e koymak padding'i azaltır
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            encoded = self.tokenizer(
+                [texts[i] for i in batch], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors='np'
+            )
+            feeds = {k: v.astype(np.int64) for k, v in encoded.items() if k in self._input_names}
+            hidden = self.session.run(None, feeds)[0]
+            mask = encoded['attention_mask'][..., None].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            for i, vector in zip(batch, pooled):
+                vectors[i] = vector.tolist()
+        return vectors
+
+    def embed_documents(self, texts):
+        return self._encode(list(texts))
+
+    def embed_query(self, text):
+        return self._encode([text])[0]
+
+
+def create_embeddings(backend='torch', model_name=EMBEDDING_MODEL, batch_size=EMBED_BATCH_SIZE):
+    """Ada göre embedding backend'i oluşturur: 'torch', 'onnx' veya 'onnx-int8'"""
+    if backend == 'torch':
+        return HuggingFaceEmbeddings(model_name=model_name, encode_kwargs={'batch_size': batch_size})
+    if backend in ('onnx', 'onnx-int8'):
+        return OnnxEmbeddings(model_name, quantize=backend == 'onnx-int8', batch_size=batch_size)
+    raise ValueError(f"Bilinmeyen embedding backend: {backend} (seçenekler: {', '.join(EMBEDDING_BACKENDS)})")
+
+
+# Süreç havuzundaki her işçinin kendi model kopyası
+_worker_embeddings = None
+
+
+def _init_worker(backend, model_name, batch_size, threads):
+    global _worker_embeddings
+    _worker_embeddings = create_embeddings(backend, model_name, batch_size)
+    try:
+        import torch
+        # Çekirdekler işçiler arasında paylaşılır; aşırı thread rekabeti önlenir
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+
+
+def _embed_batch(texts):
+    return np.asarray(_worker_embeddings.embed_documents(texts), dtype=np.float32)
+
+
+def _batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class BatchEmbedder:
+    """Metin akışını sabit boyutlu batch'ler halinde embed eder.
+
+    embed() sırayı koruyarak her batch için float32 bir matris üretir; metinler
+    tembel okunur ve aynı anda en fazla 2 × workers batch bellekte bekler.
+    workers > 1 ise batch'ler ayrı süreçlerde (her biri kendi model kopyasıyla)
+    embed edilir; aksi halde verilen embeddings nesnesi kullanılır.
+    """
+
+    def __init__(self, embeddings, backend='torch', model_name=EMBEDDING_MODEL,
+                 batch_size=BUILD_BATCH_SIZE, workers=1):
+        self.embeddings = embeddings
+        self.backend = backend
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.workers = max(1, workers)
+
+    def embed(self, texts):
+        batches = _batched(texts, self.batch_size)
+        if self.workers == 1:
+            for batch in batches:
+                yield np.asarray(self.embeddings.embed_documents(batch), dtype=np.float32)
+            return
+
+        threads = max(1, (os.cpu_count() or 1) // self.workers)
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.backend, self.model_name, EMBED_BATCH_SIZE, threads),
+        ) as pool:
+            pending = deque()
+            for batch in batches:
+                pending.append(pool.submit(_embed_batch, batch))
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
@@ -0,0 +1,378 @@
+"""Retrieval kalitesi ile hız ve bellek arasındaki dengeyi ölçen çevrimdışı değerlendirme.
+
+Etiketli sorgu kümesi veri dosyasından üretilir: örneklenen her kaydın sorusu
+üç biçimde sorulur (exact: kayıtlı soru, ascii: küçük harf ve Türkçe
+karakterler olmadan, partial: kelimelerin bir kısmı atılmış). Doğru cevap
+kaydın answer_id'sidir; aynı cevabı paylaşan her döküman isabet sayılır.
+
+Retrieval modları: dense (yalnızca FAISS), hybrid (FAISS + BM25) ve pipeline
+(sohbetteki yolun aynısı: FinancialChatbot._prepare ile yönlendirici, bölüm
+yönlendirmesi ve BM25 hızlı yolu dahil). pipeline modunda yönlendiricinin
+yerel olarak cevapladığı sorgular 'routed' olarak sayılıp metriklere katılmaz
+ve arama gecikmesi sorgu embedding'ini de içerir.
+
+Ayrıca hızlı başlangıç çiplerinin (QUICK_START_PROMPTS) bölüm yönlendirmesi
+yüzünden financial_literacy cevaplarını kaybetmediği ve hesaplayıcının
+yalnızca açık hesap isteklerini cevapladığı (ROUTER_CASES) kontrol edilir.
+
+Her yapılandırma için recall@k, MRR, distinct-answer@k, ilk sonuç kategori
+doğruluğu, sorgu başına arama gecikmesi ve index belleği raporlanır. Sonuçlar
+data/eval_results/ altına yazılır ve bir önceki çalıştırmayla karşılaştırılır.
+
+Kullanım:
+    python evaluate.py --queries 300 --config "hybrid Flat" --config "dense Flat" \
+        --config "hybrid HNSW32 efSearch=64" --config "hybrid/dedup Flat" --config "pipeline Flat"
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from benchmark import parse_index_config
+from corpus import iter_records, resolve_corpus_path
+from lexical import normalize_tr
+from llm_backends import FakeLLM
+from metrics import summarize
+from rag_pipeline import (
+    CANDIDATE_FACTOR, INDEX_CACHE_DIR, RETRIEVAL_K, FinancialChatbot, answer_id, build_faiss_index,
+    index_memory_bytes,
+)
+from warm_answers import QUICK_START_PROMPTS
+
+RESULTS_DIR = 'data/eval_results'
+DEFAULT_CONFIGS = ('pipeline Flat', 'hybrid Flat', 'dense Flat')
+RETRIEVAL_MODES = ('dense', 'hybrid', 'pipeline')
+# Yönlendirme kontrolünde karşılaştırılan kategori
+CURATED_CATEGORY = 'financial_literacy'
+# (soru, hesaplayıcı cevaplamalı mı); tavsiye ve kural soruları LLM'e gitmeli
+ROUTER_CASES = (
+    ("100.000 TL için 32 gün vadede yıllık %45 faizle net getiri ne kadar?", True),
+    ("100.000 TL mevduat 32 gün vade, %10 stopaj düşülünce faiz %45 ile net getiri?", True),
+    ("Aylık 2.500 TL birikimle %12 yıllık getiriyle 60.000 TL'ye kaç ayda ulaşırım?", True),
+    ("50.000 TL borcum var, %36 yıllık faiz, aylık 2.000 TL ödersem kaç ayda biter?", True),
+    ("100.000 TL kredi yıllık %36 faiz 2 yıl vade ile aylık taksiti hesapla", True),
+    ("Vadesiz hesabımdaki 5.000 TL parayı 3 gün içinde çekebilir miyim?", False),
+    ("Mevduat sigortası 650.000 TL'ye kadar mı? 30 gün içinde ödenir mi?", False),
+    ("Stopaj oranı 100.000 TL ve 32 gün için neden farklı?", False),
+    ("Vadeli hesabımı 10 gün önce açtım, 50.000 TL yatırdım, bozarsam ne olur?", False),
+    ("100.000 TL için 32 gün vadede net getiri ne kadar?", False),
+    ("Aylık 5.000 TL birikim yapıp 100.000 TL'lik araba almak mantıklı mı?", False),
+    ("12 ay vadeli 100.000 TL ihtiyaç kredisi %3 faizle mi yoksa birikimle mi?", False),
+    ("50.000 TL borcum var, %3 faiz, aylık 2.000 TL ödüyorum, yapılandırma önerir misiniz?", False),
+)
+QUERY_VARIANTS = ('exact', 'ascii', 'partial')
+# partial sorgularda her kelimenin tutulma olasılığı; kısa sorular atlanır
+PARTIAL_KEEP = 0.6
+PARTIAL_MIN_WORDS = 4
+
+
+def partial_question(question, rng):
+    """Kelimelerin bir kısmını atar; çok kısa sorularda None döner"""
+    words = question.split()
+    if len(words) < PARTIAL_MIN_WORDS:
+        return None
+    kept = [w for w in words if rng.random() < PARTIAL_KEEP]
+    return " ".join(kept) if len(kept) >= 2 else None
+
+
+def build_query_set(data_path, n, seed=42):
+    """Veri dosyasından n kayıt örnekler ve etiketli sorguları üretir.
+
+    Kayıtlar akış halinde okunur (reservoir sampling); her sorgu
+    {'text', 'variant', 'answer_id', 'category'} sözlüğüdür.
+    """
+    rng = random.Random(seed)
+    sample = []
+    for i, item in enumerate(iter_records(resolve_corpus_path(data_path))):
+        if len(sample) < n:
+            sample.append(item)
+        else:
+            j = rng.randrange(i + 1)
+            if j < n:
+                sample[j] = item
+
+    queries = []
+    for item in sample:
+        variants = {
+            'exact': item['question'],
+            'ascii': normalize_tr(item['question']),
+            'partial': partial_question(item['question'], rng),
+        }
+        for variant in QUERY_VARIANTS:
+            if variants[variant]:
+                queries.append({
+                    'text': variants[variant],
+                    'variant': variant,
+                    'answer_id': answer_id(item['answer']),
+                    'category': item['category'],
+                })
+    return queries
+
+
+def parse_config(spec):
+    """'hybrid/dedup HNSW32 efSearch=64' -> retrieval, index modu, FAISS tanımı ve parametreleri"""
+    mode, _, index_spec = spec.partition(' ')
+    retrieval, _, index_mode = mode.partition('/')
+    factory, params = parse_index_config(index_spec or 'Flat')
+    return {
+        'name': spec,
+        'retrieval': retrieval,
+        'index_mode': index_mode or 'full',
+        'factory': factory,
+        'params': params,
+    }
+
+
+def score(ranked_answers, truth, k):
+    """Tek sorgunun (isabet, karşılıklı sıra, farklı cevap oranı) değerleri"""
+    top = ranked_answers[:k]
+    rank = top.index(truth) + 1 if truth in top else None
+    return (
+        1.0 if rank else 0.0,
+        1.0 / rank if rank else 0.0,
+        len(set(top)) / k,
+    )
+
+
+def _aggregate(rows):
+    n = len(rows)
+    if not n:
+        return {'queries': 0, 'recall_at_k': 0.0, 'mrr': 0.0, 'distinct_at_k': 0.0, 'category_at_1': 0.0}
+    return {
+        'queries': n,
+        'recall_at_k': sum(r['hit'] for r in rows) / n,
+        'mrr': sum(r['rr'] for r in rows) / n,
+        'distinct_at_k': sum(r['distinct'] for r in rows) / n,
+        'category_at_1': sum(r['category'] for r in rows) / n,
+    }
+
+
+def evaluate_config(bot, config, queries, query_vectors, k=RETRIEVAL_K):
+    """Yapılandırmayı bot'un vektörleri üzerinde çalıştırır ve metrikleri döndürür.
+
+    FAISS index'i Flat index'ten geri çıkarılan vektörlerle kurulur ve
+    değerlendirme süresince bot'un index'inin yerine geçer; konumlar aynı
+    kaldığı için döküman kimlik eşlemesi geçerlidir. pipeline modunda bölüm
+    alt index'leri bot'un kendi index'leri olarak kalır.
+    """
+    if config['retrieval'] not in RETRIEVAL_MODES:
+        raise ValueError(f"Geçersiz retrieval modu: {config['retrieval']}")
+    original = bot.vectorstore.index
+    vectors = original.reconstruct_n(0, original.ntotal)
+    start = time.perf_counter()
+    index = build_faiss_index(vectors, config['factory'], config['params'])
+    index.add(vectors)
+    build_s = time.perf_counter() - start
+
+    pipeline = config['retrieval'] == 'pipeline'
+    lexical = bot.lexical if config['retrieval'] == 'hybrid' else None
+    rows, latencies, routed = [], [], 0
+    bot.vectorstore.index = index
+    try:
+        for query, vector in zip(queries, query_vectors):
+            start = time.perf_counter()
+            if pipeline:
+                answer, _, _, docs = bot._prepare(query['text'], {})
+                if answer is not None:
+                    routed += 1
+                    continue
+            else:
+                hits = lexical.search(query['text'], k * CANDIDATE_FACTOR) if lexical is not None else None
+                docs = bot.retrieve(vector, k, lexical_hits=hits)
+            latencies.append(time.perf_counter() - start)
+            answers = [doc.metadata['answer_id'] for doc in docs]
+            hit, rr, distinct = score(answers, query['answer_id'], k)
+            top_category = docs[0].metadata['category'] if docs else None
+            rows.append({
+                'variant': query['variant'], 'hit': hit, 'rr': rr, 'distinct': distinct,
+                'category': 1.0 if top_category == query['category'] else 0.0,
+            })
+    finally:
+        bot.vectorstore.index = original
+
+    result = {
+        'config': config['name'],
+        'k': k,
+        'documents': index.ntotal,
+        'index_bytes': index_memory_bytes(index),
+        'build_s': build_s,
+        'search': summarize(latencies),
+        'routed': routed,
+    }
+    result.update(_aggregate(rows))
+    result['by_variant'] = {
+        variant: _aggregate([r for r in rows if r['variant'] == variant])
+        for variant in QUERY_VARIANTS if any(r['variant'] == variant for r in rows)
+    }
+    return result
+
+
+def check_prompts(bot, prompts=QUICK_START_PROMPTS, category=CURATED_CATEGORY):
+    """Bölüm yönlendirmesinin sabit prompt'larda `category` cevaplarını kaybettirmediğini kontrol eder.
+
+    Her prompt _prepare ile yönlendirmeli ve yönlendirmesiz (tüm dökümanlar)
+    aranır; yönlendirmesiz aramada ilk sıralarda çıkan `category` cevaplarından
+    biri yönlendirmeli aramada yoksa prompt hatalı sayılır. Her prompt için
+    {'prompt', 'routed', 'plain', 'missing'} sözlüklerini döndürür.
+    """
+    def answers(prompt):
+        answer, _, _, docs = bot._prepare(prompt, {})
+        if answer is not None:
+            return None
+        return [doc.metadata['answer_id'] for doc in docs if doc.metadata['category'] == category]
+
+    partitions = bot.partitions
+    results = []
+    for prompt in prompts:
+        routed = answers(prompt)
+        bot.partitions = None
+        try:
+            plain = answers(prompt)
+        finally:
+            bot.partitions = partitions
+        if routed is None or plain is None:
+            continue
+        results.append({
+            'prompt': prompt, 'routed': routed, 'plain': plain,
+            'missing': [a for a in plain if a not in routed],
+        })
+    return results
+
+
+def check_router(router, cases=ROUTER_CASES):
+    """Hesaplayıcının beklenenden farklı davrandığı soruları döndürür"""
+    return [question for question, expected in cases if (router.calculate(question) is not None) != expected]
+
+
+def load_bot(data_path, index_mode, cache_dir, embedding_backend=None):
+    """Değerlendirme için LLM'siz, önbelleksiz bir chatbot kurar (Flat index, BM25 açık)"""
+    return FinancialChatbot(
+        data_path=data_path, cache_dir=cache_dir, answer_cache=False, index_mode=index_mode,
+        llm=FakeLLM(delay=0), embedding_backend=embedding_backend, retrieval='hybrid',
+    )
+
+
+def run(data_path, specs, n_queries, k=RETRIEVAL_K, seed=42, cache_dir=INDEX_CACHE_DIR, embedding_backend=None):
+    queries = build_query_set(data_path, n_queries, seed)
+    configs = [parse_config(spec) for spec in specs]
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'data': data_path,
+        'seed': seed,
+        'queries': len(queries),
+        'configs': [],
+    }
+    bots, query_vectors = {}, None
+    for config in configs:
+        index_mode = config['index_mode']
+        if index_mode not in bots:
+            bots[index_mode] = load_bot(data_path, index_mode, cache_dir, embedding_backend)
+        bot = bots[index_mode]
+        if query_vectors is None:
+            # Tüm index modları aynı embedding modelini kullanır; sorgular bir kez embed edilir
+            embed = []
+            query_vectors = []
+            for query in queries:
+                start = time.perf_counter()
+                query_vectors.append(bot.embeddings.embed_query(query['text']))
+                embed.append(time.perf_counter() - start)
+            query_vectors = np.asarray(query_vectors, dtype=np.float32)
+            results['embed'] = summarize(embed)
+            results['embedding_backend'] = bot.embedding_backend
+        print(f" Değerlendiriliyor: {config['name']}")
+        results['configs'].append(evaluate_config(bot, config, queries, query_vectors, k))
+    bot = bots.get('full') or load_bot(data_path, 'full', cache_dir, embedding_backend)
+    results['prompt_checks'] = check_prompts(bot)
+    results['router_failures'] = check_router(bot.router)
+    return results
+
+
+def save_results(results, out_dir=RESULTS_DIR):
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, f"eval-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def load_previous(out_dir=RESULTS_DIR):
+    """En son kaydedilmiş değerlendirme sonucunu döndürür; yoksa None"""
+    paths = sorted(glob.glob(os.path.join(out_dir, 'eval-*.json')))
+    if not paths:
+        return None
+    with open(paths[-1], 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _delta(value, previous, key, percent=True):
+    if previous is None:
+        return ""
+    change = value - previous[key]
+    return f" ({change * 100:+.1f})" if percent else f" ({change:+.3f})"
+
+
+def print_report(results, previous=None):
+    before = {row['config']: row for row in previous['configs']} if previous else {}
+    k = results['configs'][0]['k'] if results['configs'] else RETRIEVAL_K
+    print(f"\n=== Retrieval değerlendirmesi ({results['queries']} sorgu, k={k}) ===")
+    if previous:
+        print(f" Parantez içindeki farklar {previous['timestamp']} çalıştırmasına göre")
+    embed = results.get('embed')
+    if embed:
+        print(f" Sorgu embedding: p50={embed['p50'] * 1000:.1f}ms  p95={embed['p95'] * 1000:.1f}ms")
+    for row in results['configs']:
+        old = before.get(row['config'])
+        print(
+            f" {row['config']:<28} recall@{k} %{row['recall_at_k'] * 100:.1f}{_delta(row['recall_at_k'], old, 'recall_at_k')}  "
+            f"MRR {row['mrr']:.3f}{_delta(row['mrr'], old, 'mrr', percent=False)}  "
+            f"distinct@{k} %{row['distinct_at_k'] * 100:.0f}  kategori@1 %{row['category_at_1'] * 100:.1f}  "
+            f"arama p50={row['search']['p50'] * 1000:.2f}ms p95={row['search']['p95'] * 1000:.2f}ms  "
+            f"{row['index_bytes'] / 1024:.0f} KB"
+        )
+        if row.get('routed'):
+            print(f"   yönlendiricinin cevapladığı sorgular: {row['routed']} (metriklere katılmadı)")
+        for variant, stats in row['by_variant'].items():
+            print(f"   {variant:<10} recall@{k} %{stats['recall_at_k'] * 100:.1f}  MRR {stats['mrr']:.3f}")
+    checks = results.get('prompt_checks')
+    if checks is not None:
+        failed = [c for c in checks if c['missing']]
+        print(f"\n Hızlı başlangıç çipleri: {len(checks) - len(failed)}/{len(checks)} yönlendirme kontrolünden geçti")
+        for check in failed:
+            print(f"   '{check['prompt']}' yönlendirilince {len(check['missing'])} {CURATED_CATEGORY} cevabı kayboluyor")
+    failures = results.get('router_failures')
+    if failures is not None:
+        print(f" Hesaplayıcı yönlendirmesi: {len(ROUTER_CASES) - len(failures)}/{len(ROUTER_CASES)} soru beklendiği gibi")
+        for question in failures:
+            print(f"   '{question}' beklenenin tersine yönlendirildi")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Retrieval kalite/hız değerlendirmesi")
+    parser.add_argument('--data', default='data/all_qa_data.json')
+    parser.add_argument('--queries', type=int, default=300, help="Örneklenecek kayıt sayısı")
+    parser.add_argument('--k', type=int, default=RETRIEVAL_K)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--config', action='append',
+                        help="'retrieval[/index_modu] faiss_tanımı [param=değer]', ör. 'hybrid/dedup HNSW32 efSearch=64' "
+                             "(tekrarlanabilir)")
+    parser.add_argument('--embeddings', help="Embedding backend'i (torch, onnx, onnx-int8)")
+    parser.add_argument('--cache-dir', default=INDEX_CACHE_DIR)
+    parser.add_argument('--output-dir', default=RESULTS_DIR)
+    args = parser.parse_args()
+
+    previous = load_previous(args.output_dir)
+    results = run(args.data, args.config or DEFAULT_CONFIGS, args.queries, args.k, args.seed,
+                  args.cache_dir, args.embeddings)
+    print_report(results, previous)
+    print(f"\n Sonuçlar {save_results(results, args.output_dir)} dosyasına kaydedildi")
+    if any(check['missing'] for check in results['prompt_checks']) or results['router_failures']:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
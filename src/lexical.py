@@ -0,0 +1,104 @@
+import heapq
+import math
+import re
+from collections import Counter
+
+# Türkçe karakterleri ASCII karşılıklarına indirger; "sifre" ile "şifre" eşleşir
+_TR_FOLD = str.maketrans("çğıöşüâîû", "cgiosuaiu")
+_TR_UPPER = str.maketrans({"I": "ı", "İ": "i"})
+_TOKEN_RE = re.compile(r"\w+")
+
+# ASCII'ye indirgenmiş yaygın çekim/iyelik ekleri, uzundan kısaya
+_SUFFIXES = sorted({
+    "larinizi", "lerinizi", "lariniz", "leriniz", "larindan", "lerinden", "larinin", "lerinin", "larini", "lerini", "larina", "lerine",
+    "lari", "leri", "lar", "ler", "sinin", "sini", "sina", "sine", "inin", "unun",
+    "nin", "nun", "dan", "den", "tan", "ten", "daki", "deki", "yla", "yle", "la", "le",
+    "imiz", "iniz", "umuz", "unuz", "miz", "niz", "muz", "nuz",
+    "da", "de", "ta", "te", "yi", "yu", "ya", "ye", "si", "su", "in", "un", "im", "um",
+    "mi", "mu", "m", "n", "i", "u", "a", "e",
+}, key=len, reverse=True)
+# Ünsüz yumuşaması: "hesabı" -> "hesab" -> "hesap"
+_SOFTENING = {"b": "p", "d": "t", "g": "k"}
+_MIN_STEM = 3
+_MAX_STRIP = 3
+
+
+def normalize_tr(text):
+    """Türkçe büyük/küçük harf (I/ı, İ/i) kurallarıyla küçültür ve aksanları indirger"""
+    return text.translate(_TR_UPPER).lower().translate(_TR_FOLD)
+
+
+def stem_tr(token):
+    """Sondan en fazla üç ek çıkaran hafif Türkçe kök bulucu"""
+    for _ in range(_MAX_STRIP):
+        for suffix in _SUFFIXES:
+            if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+                token = token[:-len(suffix)]
+                break
+        else:
+            break
+    if token[-1] in _SOFTENING:
+        token = token[:-1] + _SOFTENING[token[-1]]
+    return token
+
+
+def tokenize(text):
+    return [stem_tr(t) for t in _TOKEN_RE.findall(normalize_tr(text))]
+
+
+def reciprocal_rank_fusion(rankings, k=60):
+    """Birden çok sıralamayı RRF ile birleştirir: skor = Σ 1 / (k + sıra)"""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+class BM25Index:
+    """Dökümanlar üzerinde bellek içi BM25 ters index'i.
+
+    `confidence` en iyi sonucun tüm sorgu terimlerini içerip içermediğini
+    ölçer; kısa anahtar kelime sorgularında yüksek güven, embedding modelini
+    hiç çalıştırmadan cevap verilebileceğini gösterir.
+    """
+
+    def __init__(self, doc_ids, texts, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.doc_ids = list(doc_ids)
+        self.postings = {}
+        self.doc_len = []
+        for n, text in enumerate(texts):
+            terms = Counter(tokenize(text))
+            self.doc_len.append(sum(terms.values()))
+            for term, tf in terms.items():
+                self.postings.setdefault(term, []).append((n, tf))
+        count = len(self.doc_len)
+        self.avgdl = sum(self.doc_len) / count if count else 0.0
+        self.idf = {
+            term: math.log(1 + (count - len(p) + 0.5) / (len(p) + 0.5))
+            for term, p in self.postings.items()
+        }
+
+    def search(self, query, k=30):
+        """(döküman kimliği, skor) listesini skora göre azalan sırada döndürür"""
+        scores = {}
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for n, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.doc_len[n] / self.avgdl)
+                scores[n] = scores.get(n, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+        best = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+        return [(self.doc_ids[n], score) for n, score in best]
+
+    def confidence(self, query, hits):
+        """En iyi skorun, tüm sorgu terimlerini bir kez içeren ortalama uzunlukta
+        bir dökümanın skoruna oranı (0-1)"""
+        terms = set(tokenize(query))
+        if not hits or not terms or any(t not in self.idf for t in terms):
+            return 0.0
+        reference = sum(self.idf[t] for t in terms)
+        return min(1.0, hits[0][1] / reference) if reference else 0.0
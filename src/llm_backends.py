@@ -0,0 +1,63 @@
+import os
+import time
+from typing import Any, Iterator, List, Optional
+
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+
+GEMINI_MODEL = "gemini-2.5-flash"
+FAKE_RESPONSE = (
+    "Bu bir test cevabıdır. Bütçenizi gelir ve giderlerinize göre planlayın, "
+    "düzenli tasarruf yapın ve borçlarınızı zamanında ödeyin."
+)
+
+
+class FakeLLM(LLM):
+    """Ağ gerektirmeyen, sabit metin döndüren deterministik LLM.
+
+    Benchmark ve testlerde Gemini yerine kullanılır. `delay` ilk parçadan önce
+    beklenen süredir; `token_delay` stream sırasında her kelime arasına eklenir.
+    """
+
+    response: str = FAKE_RESPONSE
+    delay: float = 0.0
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> str:
+        time.sleep(self.delay + self.token_delay * len(self.response.split()))
+        return self.response
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+                **kwargs: Any) -> Iterator[GenerationChunk]:
+        time.sleep(self.delay)
+        words = self.response.split(" ")
+        for i, word in enumerate(words):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            text = word if i == len(words) - 1 else word + " "
+            chunk = GenerationChunk(text=text)
+            if run_manager:
+                run_manager.on_llm_new_token(text, chunk=chunk)
+            yield chunk
+
+
+def create_llm(backend="gemini", **kwargs):
+    """Ada göre LLM oluşturur: 'gemini' (varsayılan) veya 'fake'"""
+    if backend == "fake":
+        return FakeLLM(**kwargs)
+    if backend == "gemini":
+        from langchain_google_genai import GoogleGenerativeAI
+
+        if not os.getenv("GOOGLE_API_KEY"):
+            raise ValueError("❌ GOOGLE_API_KEY bulunamadı! .env dosyasını kontrol edin.")
+        return GoogleGenerativeAI(
+            model=GEMINI_MODEL,
+            temperature=kwargs.pop("temperature", 0.3),
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
+            **kwargs
+        )
+    raise ValueError(f"Bilinmeyen LLM backend: {backend} (seçenekler: gemini, fake)")
@@ -0,0 +1,110 @@
+import json
+import math
+import os
+import threading
+from collections import deque
+
+
+def percentile(values, q):
+    """Sıralı olmayan bir listenin q. yüzdelik değerini (nearest-rank) döndürür"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values):
+    """Gecikme listesinden ortalama ve p50/p95/p99 özetini üretir"""
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else 0.0,
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+    }
+
+
+class LatencyRecorder:
+    """Aşama bazında son `maxlen` ölçümü tutan sınırlı gecikme histogramı.
+
+    Streamlit oturumları aynı chatbot örneğini paylaştığı için kayıt kilitlidir.
+    """
+
+    def __init__(self, maxlen=1000):
+        self.maxlen = maxlen
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def record(self, timings):
+        """{aşama: saniye} sözlüğündeki ölçümleri ekler"""
+        with self._lock:
+            for stage, seconds in timings.items():
+                if stage not in self._samples:
+                    self._samples[stage] = deque(maxlen=self.maxlen)
+                self._samples[stage].append(seconds)
+
+    def summary(self):
+        """Her aşama için ölçüm sayısı ve p50/p95 (sn)"""
+        with self._lock:
+            snapshot = {stage: list(values) for stage, values in self._samples.items()}
+        return {
+            stage: {'count': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95)}
+            for stage, values in snapshot.items()
+        }
+
+
+class TraceLog:
+    """Her isteği bir JSON satırı olarak dosyaya ekleyen isteğe bağlı iz kaydı"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, event):
+        line = json.dumps(event, ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+def current_rss_mb():
+    """Sürecin şu anki RSS değeri (MB); /proc yoksa tepe değeri döndürür"""
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    import sys
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS bayt, Linux kilobayt döndürür
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def process_memory_mb(pid=None):
+    """Sürecin RSS ve PSS değerleri (MB): {'rss', 'pss', 'shared', 'private'}.
+
+    PSS paylaşılan sayfaları paylaşan süreç sayısına böler; süreçlerin toplam
+    fiziksel belleği PSS'lerin toplamıdır. /proc/<pid>/smaps_rollup yoksa
+    (Linux dışı) None döner.
+    """
+    fields = {
+        'Rss:': 'rss', 'Pss:': 'pss', 'Shared_Clean:': 'shared', 'Shared_Dirty:': 'shared',
+        'Private_Clean:': 'private', 'Private_Dirty:': 'private',
+    }
+    try:
+        with open(f"/proc/{pid or 'self'}/smaps_rollup", 'r') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+    usage = dict.fromkeys(fields.values(), 0.0)
+    for line in lines:
+        parts = line.split()
+        if parts and parts[0] in fields:
+            usage[fields[parts[0]]] += int(parts[1]) / 1024
+    return usage
@@ -0,0 +1,83 @@
+"""Aynı makinedeki süreçlerin sayfa önbelleği üzerinden paylaşabildiği index dosyaları.
+
+Normalde her Streamlit süreci (ve her FinancialChatbot örneği) FAISS
+vektörlerinin ve konum -> döküman kimliği eşlemesinin kendi kopyasını tutar.
+Buradaki yapılar dosyaları mmap ile açar; süreçler aynı fiziksel sayfaları
+paylaşır ve yalnızca dokunulan sayfalar belleğe gelir:
+
+- FAISS index'i IO_FLAG_MMAP_IFC ile okunur: Flat/SQ/PQ kodları, IVF listeleri
+  ve HNSW'nin vektör deposu dosyada kalır (HNSW grafiği süreç belleğindedir).
+- Döküman kimlikleri tek bir UTF-8 metin bloğu (.bin) ve int64 ofset
+  tablosu (.npy) olarak saklanır (StringTable).
+
+mmap ile açılan index'ler salt okunurdur; ekleme ve silme için index normal
+okunup yeniden yazılır. Dosyalar her zaman geçici adla yazılıp yerine
+taşınır, böylece eski dosyayı açık tutan süreçler etkilenmez.
+"""
+import os
+from collections.abc import Mapping
+
+import faiss
+import numpy as np
+
+MMAP_FLAGS = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+INDEX_FILE = 'index.faiss'
+IDS_FILE = 'doc_ids'
+
+
+def read_index_mmap(path):
+    """FAISS index'ini salt okunur ve mmap ile açar"""
+    return faiss.read_index(path, MMAP_FLAGS)
+
+
+def write_index(index, path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+
+def write_strings(path, strings):
+    """Metinleri path.bin bloğuna, başlangıç ofsetlerini path.npy tablosuna yazar"""
+    offsets = [0]
+    tmp_suffix = f".{os.getpid()}.tmp"
+    with open(path + '.bin' + tmp_suffix, 'wb') as f:
+        for text in strings:
+            f.write(text.encode('utf-8'))
+            offsets.append(f.tell())
+    with open(path + '.npy' + tmp_suffix, 'wb') as f:
+        np.save(f, np.asarray(offsets, dtype=np.int64))
+    os.replace(path + '.bin' + tmp_suffix, path + '.bin')
+    os.replace(path + '.npy' + tmp_suffix, path + '.npy')
+    return len(offsets) - 1
+
+
+def strings_exist(path):
+    return os.path.exists(path + '.bin') and os.path.exists(path + '.npy')
+
+
+class StringTable(Mapping):
+    """Sıra numarası -> metin eşlemesi; blok ve ofset tablosu mmap ile açılır.
+
+    Salt okunur bir dict gibi davranır; FAISS.index_to_docstore_id yerine
+    kullanılabilir.
+    """
+
+    def __init__(self, path):
+        self.offsets = np.load(path + '.npy', mmap_mode='r')
+        # Boş dosya mmap ile açılamaz
+        if os.path.getsize(path + '.bin'):
+            self.blob = np.memmap(path + '.bin', dtype=np.uint8, mode='r')
+        else:
+            self.blob = np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return iter(range(len(self)))
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise KeyError(i)
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        return self.blob[start:end].tobytes().decode('utf-8')
@@ -0,0 +1,193 @@
+"""Kategori bazlı alt index'ler ve sorgu için ucuz bir kategori sınıflandırıcı.
+
+Ana FAISS index'i tüm dökümanları tutmaya devam eder (kayıt, artımlı
+güncelleme ve filtresiz arama için). Alt index'ler açılışta ana index'ten
+geri çıkarılan vektörlerle kurulur; her alt index'teki konum ana index'teki
+konuma eşlenir, böylece döküman kimlikleri değişmez. Paylaşımlı bellek
+modunda alt index'ler diske yazılır ve mmap ile açılır (bkz. mmap_store).
+"""
+import json
+import os
+import re
+import threading
+
+import numpy as np
+import faiss
+
+from lexical import normalize_tr
+from mmap_store import read_index_mmap, write_index
+
+# Bu boyutun altındaki bölümler her zaman tam arama (Flat) ile aranır;
+# IVF/PQ eğitimi küçük bölümlerde anlamsızdır
+PARTITION_FLAT_LIMIT = 20000
+
+# normalize_tr sonrası metinde kelime başında aranan ifadeler. Bankacılık
+# corpus'u İngilizce çağrı merkezi konuşmalarından oluşur. Borç ve kredi
+# kartı soruları her iki kategoriye de uyar; ikisi birden eşleşince daraltılmaz.
+PARTITION_KEYWORDS = {
+    'financial_literacy': [
+        'butce', 'yatirim', 'tasarruf', 'birik', 'enflasyon', 'emeklilik', 'acil fon', 'acil durum fon',
+        'kredi not', 'kredi kart', 'borc', 'sigorta', 'borsa', 'hisse', 'portfoy', 'altin', 'doviz',
+        'mevduat', 'fon ', 'finansal okuryazar',
+    ],
+    'banking': [
+        'kart', 'card', 'hesab', 'hesap', 'account', 'havale', 'eft', 'transfer', 'payment',
+        'fatura', 'atm', 'bakiye', 'balance', 'pin ', 'sifre', 'password', 'loan', 'debit', 'bank',
+        'fraud', 'dolandir', 'login', 'uygulama', 'mobile', 'statement', 'ekstre',
+    ],
+}
+
+
+def _compile(keywords):
+    return {
+        category: re.compile(r"\b(?:" + "|".join(re.escape(w) for w in words) + ")")
+        for category, words in keywords.items()
+    }
+
+
+_PATTERNS = _compile(PARTITION_KEYWORDS)
+
+# Az sayıda, seçilmiş içerik barındıran bölümler daraltılmış aramalara eklenir;
+# eklemek aramayı tüm bölümlere genişletecekse eklenmez (iki kategorili
+# corpus'ta banking soruları yalnızca banking bölümünde aranır)
+PARTITION_ALWAYS = ('financial_literacy',)
+
+
+def classify_query(question, categories=None):
+    """Soruda yalnızca tek bir kategorinin anahtar kelimesi geçiyorsa onu döndürür.
+
+    Hiçbir kategori veya birden çok kategori eşleşirse None döner ve tüm
+    dökümanlarda aranır. categories verilirse yalnızca bu kategoriler dikkate alınır.
+    """
+    text = normalize_tr(question) + " "
+    matched = [
+        category for category, pattern in _PATTERNS.items()
+        if (categories is None or category in categories) and pattern.search(text)
+    ]
+    return matched[0] if len(matched) == 1 else None
+
+
+def route_categories(question, categories):
+    """Aranacak bölümlerin listesini döndürür; tüm bölümler aranacaksa None.
+
+    Yalnızca net bir eşleşmede daraltılır. PARTITION_ALWAYS bölümleri,
+    sonuç hâlâ bölümlerin bir alt kümesi olarak kalıyorsa eklenir.
+    """
+    category = classify_query(question, categories)
+    if category is None:
+        return None
+    routed = {category} | {c for c in PARTITION_ALWAYS if c in categories}
+    if len(routed) == len(categories):
+        routed = {category}
+    return sorted(routed) if len(routed) < len(categories) else None
+
+
+def reconstruct_vectors(index, positions):
+    """Ana index'teki konumların vektörlerini geri çıkarır (PQ'da yaklaşık)"""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+    return index.reconstruct_batch(np.asarray(positions, dtype=np.int64))
+
+
+class PartitionedIndex:
+    """Ana index'in kategori bazlı alt index'leri.
+
+    positions: {kategori: alt index konumlarının ana index'teki karşılıkları},
+    indexes: {kategori: FAISS alt index'i}. Ana index'ten kurmak için build,
+    diske yazıp (mmap ile) geri açmak için save/load kullanılır.
+    """
+
+    def __init__(self, positions, indexes):
+        self.positions = positions
+        self.indexes = indexes
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, index, position_categories, build_index, index_factory='Flat'):
+        """position_categories: ana index'teki her konumun kategorisi.
+        build_index(vektörler, factory): boş (gerekirse eğitilmiş) index üretir; alt
+        index'ler PARTITION_FLAT_LIMIT'ten küçükse 'Flat', değilse index_factory ile kurulur.
+        """
+        position_categories = np.asarray(position_categories, dtype=object)
+        positions, indexes = {}, {}
+        for category in sorted(set(position_categories)):
+            positions[category] = np.flatnonzero(position_categories == category)
+            vectors = reconstruct_vectors(index, positions[category])
+            factory = 'Flat' if len(vectors) < PARTITION_FLAT_LIMIT else index_factory
+            indexes[category] = build_index(vectors, factory)
+            indexes[category].add(vectors)
+        return cls(positions, indexes)
+
+    def save(self, path, manifest):
+        """Alt index'leri ve konum tablolarını path dizinine yazar.
+
+        manifest (ana index'in manifest'i) en son yazılır; load yalnızca
+        aynı manifest'le kaydedilmiş bölümleri açar.
+        """
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, 'manifest.json')
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        for n, category in enumerate(self.indexes):
+            write_index(self.indexes[category], os.path.join(path, f"{n}.faiss"))
+            positions_path = os.path.join(path, f"{n}.npy")
+            with open(positions_path + '.tmp', 'wb') as f:
+                np.save(f, np.asarray(self.positions[category], dtype=np.int64))
+            os.replace(positions_path + '.tmp', positions_path)
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'index': manifest, 'categories': list(self.indexes)}, f, ensure_ascii=False)
+        os.replace(tmp_path, manifest_path)
+
+    @classmethod
+    def load(cls, path, manifest, read_index=read_index_mmap):
+        """Kayıtlı bölümleri açar; yoksa veya başka bir index'e aitse None döner"""
+        try:
+            with open(os.path.join(path, 'manifest.json'), 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get('index') != manifest:
+            return None
+        positions, indexes = {}, {}
+        for n, category in enumerate(saved['categories']):
+            positions[category] = np.load(os.path.join(path, f"{n}.npy"), mmap_mode='r')
+            indexes[category] = read_index(os.path.join(path, f"{n}.faiss"))
+        return cls(positions, indexes)
+
+    @property
+    def categories(self):
+        return list(self.indexes)
+
+    def size(self, categories):
+        return sum(len(self.positions[c]) for c in categories)
+
+    def count(self, categories):
+        """Yönlendirmenin seçtiği bölümleri sayar (None: tüm dökümanlar)"""
+        key = "+".join(categories) if categories else 'all'
+        with self._lock:
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def search(self, query_vector, k, categories):
+        """Verilen bölümlerde en yakın k vektörün ana index konumlarını döndürür"""
+        vector = np.asarray([query_vector], dtype=np.float32)
+        hits = []
+        for category in categories:
+            distances, ids = self.indexes[category].search(vector, min(k, len(self.positions[category])))
+            positions = self.positions[category]
+            hits.extend((d, int(positions[i])) for d, i in zip(distances[0], ids[0]) if i != -1)
+        hits.sort(key=lambda hit: hit[0])
+        return [position for _, position in hits[:k]]
+
+    def stats(self):
+        with self._lock:
+            routed = dict(self.counts)
+        total = sum(routed.values())
+        return {
+            'sizes': {c: len(p) for c, p in self.positions.items()},
+            'routed': routed,
+            # Aramaların ne kadarının bölümlerle daraltıldığı ('all' daraltılmamış)
+            'narrowed': (total - routed.get('all', 0)) / total if total else 0.0,
+        }
@@ -1,58 +1,300 @@
-from langchain_google_genai import GoogleGenerativeAI, GoogleGenerativeAIEmbeddings
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from langchain.vectorstores import FAISS
+from langchain.docstore.in_memory import InMemoryDocstore
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.chains import RetrievalQA
 from langchain.prompts import PromptTemplate
+from langchain.schema import Document
+from collections import OrderedDict
+from contextlib import nullcontext
+import asyncio
+import faiss
+import hashlib
+import inspect
 import json
 import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import numpy as np
 from dotenv import load_dotenv
-from langchain_google_genai import GoogleGenerativeAI
-from langchain.embeddings import HuggingFaceEmbeddings
+from answer_cache import SemanticCache
+from context import CONTEXT_TOKEN_BUDGET, ContextAssembler, estimate_tokens
+from corpus import CorpusDocstore, CorpusStore, resolve_corpus_path
+from embeddings import BUILD_BATCH_SIZE, EMBEDDING_MODEL, BatchEmbedder, create_embeddings
+from lexical import BM25Index, reciprocal_rank_fusion
+from llm_backends import create_llm
+from metrics import LatencyRecorder, TraceLog
+from mmap_store import IDS_FILE, INDEX_FILE, StringTable, read_index_mmap, strings_exist, write_strings
+from partitions import PartitionedIndex, route_categories
+from resilience import LLM_CONCURRENCY, LLM_RETRIES, LLM_TIMEOUT, ResilientLLM, StreamStalled
+from router import FAQ_CATEGORIES, IntentRouter
+from singleflight import SingleFlight, question_key
+from warm_answers import PrecomputedAnswers
 
 # .env dosyasından API key yükle
 load_dotenv()
 
+DOC_TEMPLATE = "Soru: {question}\n\nCevap: {answer}\n\nKategori: {category}"
+# dedup modunda yalnızca soru metni embed edilir; cevap ayrı tabloda tutulur
+QUESTION_TEMPLATE = "{question}"
+INDEX_MODES = ('full', 'dedup')
+INDEX_CACHE_DIR = 'data/index_cache'
+RETRIEVAL_K = 3
+RETRIEVAL_MODES = ('dense', 'hybrid')
+# hybrid modunda her iki sıralamadan alınan aday sayısı (k ile çarpılır)
+CANDIDATE_FACTOR = 10
+# Kısa anahtar kelime sorgusunda BM25 güveni bu eşiği geçerse embedding atlanır
+LEXICAL_FAST_PATH_TERMS = 3
+LEXICAL_FAST_PATH_CONFIDENCE = 0.9
+# IVF/PQ index'leri en fazla bu kadar vektörle eğitilir; gerisi akış halinde eklenir
+TRAIN_SAMPLE_SIZE = 50000
+# Embedding ilerlemesi bu kadar dökümanda bir yazdırılır
+PROGRESS_EVERY = 10000
+# Paylaşımlı bellek modunda kategori bölümlerinin index önbelleğindeki alt dizini
+PARTITIONS_DIR = 'partitions'
+# LLM süre sınırı dolarsa en iyi retrieval sonucunun kayıtlı cevabı bu notla döner
+FALLBACK_NOTE = "Şu anda ayrıntılı bir cevap üretemedim; benzer bir soru için kayıtlı bilgi:\n\n"
+
+
+def file_hash(path):
+    """Dosya içeriğinin sha256 özetini döndürür"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def index_cache_key(model_name=EMBEDDING_MODEL, template=DOC_TEMPLATE, index_mode='full', index_factory='Flat'):
+    """Embedding modeli, döküman şablonu, index modu ve FAISS index tipinden
+    önbellek anahtarı üretir.
+
+    Anahtar değişirse tüm vektörler geçersiz olur; veri değişikliği ise
+    döküman bazında artımlı olarak işlenir.
+    """
+    payload = json.dumps(
+        {"model": model_name, "template": template, "mode": index_mode, "factory": index_factory},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def answer_id(answer):
+    """Cevap metninden kısa ve kararlı bir kimlik üretir"""
+    return hashlib.sha1(answer.encode('utf-8')).hexdigest()[:12]
+
+
+def format_document(item, index_mode='full'):
+    """Tek kayıttan embed edilecek metni ve metadata'yı üretir.
+
+    full: her kayıt soru+cevap+kategori metniyle ayrı bir dökümandır.
+    dedup: her kayıt yalnızca sorusuyla embed edilir ve metadata'daki
+    answer_id ile ortak cevaba bağlanır; böylece aynı cevap metni index'te
+    yüzlerce kez tekrarlanmaz ve retrieval k farklı cevap döndürebilir.
+    """
+    template = DOC_TEMPLATE if index_mode == 'full' else QUESTION_TEMPLATE
+    metadata = {'answer_id': answer_id(item['answer']), 'category': item['category'], 'source': item.get('source')}
+    return template.format(**item), metadata
+
+
+def build_documents(data, index_mode='full'):
+    """Kayıtlardan embed edilecek metinleri, metadata'ları ve cevap tablosunu üretir"""
+    if index_mode not in INDEX_MODES:
+        raise ValueError(f"Geçersiz index modu: {index_mode} (seçenekler: {', '.join(INDEX_MODES)})")
+    texts, metadatas, answers = [], [], {}
+    for item in data:
+        text, metadata = format_document(item, index_mode)
+        answers.setdefault(metadata['answer_id'], {
+            'answer': item['answer'],
+            'category': item['category'],
+            'source': item.get('source'),
+        })
+        texts.append(text)
+        metadatas.append(metadata)
+    return texts, metadatas, answers
+
+
+def document_ids(documents):
+    """Her (metin, metadata) çifti için içerik özetinden kararlı bir kimlik üretir.
+
+    Aynı içerik birden çok kez geçiyorsa kimliklere sıra numarası eklenir.
+    """
+    seen = {}
+    ids = []
+    for text, metadata in documents:
+        content = text + json.dumps(metadata, sort_keys=True, ensure_ascii=False)
+        digest = hashlib.sha1(content.encode('utf-8')).hexdigest()[:16]
+        count = seen.get(digest, 0)
+        seen[digest] = count + 1
+        ids.append(f"{digest}-{count}")
+    return ids
+
+
+def build_faiss_index(vectors, index_factory='Flat', search_params=None):
+    """FAISS index_factory tanımından boş (gerekiyorsa eğitilmiş) bir index üretir.
+
+    Örnekler: 'Flat' (tam arama), 'IVF64,Flat', 'IVF64,PQ16', 'HNSW32',
+    'SQfp16' (float16 saklama). IVF/PQ index'leri verilen vektörlerle eğitilir.
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    index = faiss.index_factory(vectors.shape[1], index_factory)
+    if not index.is_trained:
+        index.train(vectors)
+    apply_search_params(index, search_params)
+    return index
+
+
+def apply_search_params(index, search_params):
+    """Arama parametrelerini (ör. {'nprobe': 8} veya {'efSearch': 64}) uygular"""
+    if search_params:
+        space = faiss.ParameterSpace()
+        for name, value in search_params.items():
+            space.set_index_parameter(index, name, value)
+
+
+def index_memory_bytes(index):
+    """Index'in serileştirilmiş boyutu; bellek ayak izinin yaklaşık değeri"""
+    return int(faiss.serialize_index(index).size)
+
+
+def _load_local_kwargs():
+    # Yeni langchain sürümleri pickle yüklemesi için açık onay istiyor;
+    # önbelleği kendimiz yazdığımız için güvenli.
+    if 'allow_dangerous_deserialization' in inspect.signature(FAISS.load_local).parameters:
+        return {'allow_dangerous_deserialization': True}
+    return {}
+
+
 class FinancialChatbot:
-    def __init__(self, data_path='data/all_qa_data.json'):
-        """RAG tabanlı finansal chatbot"""
+    def __init__(self, data_path='data/all_qa_data.json', cache_dir=INDEX_CACHE_DIR, answer_cache=True,
+                 index_mode='full', llm=None, trace_path=None, embedding_backend=None, retrieval='hybrid',
+                 index_factory='Flat', search_params=None, context_budget=CONTEXT_TOKEN_BUDGET,
+                 llm_timeout=LLM_TIMEOUT, llm_retries=LLM_RETRIES, hedge_after=None, llm_concurrency=None,
+                 embed_batch_size=BUILD_BATCH_SIZE, embed_workers=None, partitions=True, shared_index=None):
+        """RAG tabanlı finansal chatbot
+
+        index_mode: 'full' her kaydı ayrı döküman olarak indeksler; 'dedup' aynı
+        cevabı paylaşan kayıtları tek cevaba bağlar ve retrieval'da k farklı
+        cevap döndürür.
+        answer_cache: True varsayılan anlamsal cevap önbelleğini açar, False kapatır;
+        eşik veya boyut ayarı için doğrudan bir SemanticCache örneği verilebilir.
+        llm: LangChain uyumlu LLM; verilmezse CHATBOT_LLM ortam değişkenine göre
+        (varsayılan 'gemini') oluşturulur. Ağsız testler için 'fake' kullanılabilir.
+        retrieval: 'hybrid' FAISS ile BM25 sonuçlarını RRF ile birleştirir ve
+        güvenli anahtar kelime sorgularında embedding'i atlar; 'dense' yalnızca FAISS.
+        index_factory: FAISS index tipi ('Flat', 'IVF64,Flat', 'IVF64,PQ16',
+        'HNSW32', 'SQfp16' ...); search_params: {'nprobe': 8}, {'efSearch': 64} gibi.
+        llm_timeout: LLM çağrısının tekrar denemeler dahil süre sınırı (sn); dolarsa
+        veya çağrı başarısız olursa en iyi retrieval sonucunun kayıtlı cevabı döner.
+        llm_retries: hata veren çağrının jitter'lı üstel beklemeyle tekrar sayısı;
+        hedge_after: verilirse bu kadar saniyede cevap gelmeyen çağrıya ikinci istek eklenir.
+        llm_concurrency: aynı anda çalışabilecek LLM çağrısı; chatbot'u paylaşan
+        oturum/istek sayısına göre seçilmelidir (varsayılan CHATBOT_LLM_CONCURRENCY veya 32).
+        context_budget: prompt'a girecek bağlamın yaklaşık token bütçesi; tekrar eden
+        pasajlar atlanır, uzun metinler en alakalı cümlelerine kırpılır.
+        embedding_backend: 'torch' (varsayılan), 'onnx' veya 'onnx-int8';
+        verilmezse CHATBOT_EMBEDDINGS ortam değişkeni kullanılır.
+        partitions: True ise her kategori için ayrı bir alt index kurulur ve
+        sorgunun kategorisi anahtar kelimelerle tahmin edilip o bölümde
+        aranır (tahmin edilemezse tüm dökümanlarda; bkz.
+        partitions.route_categories). ask(..., filter={'category':
+        'banking'}) gibi açık filtreler her iki durumda da çalışır.
+        embed_batch_size, embed_workers: index kurulurken dökümanlar bu boyutta
+        batch'lerle embed edilip index'e eklenir; embed_workers > 1 ise batch'ler
+        süreç havuzunda paralel embed edilir (varsayılan CHATBOT_EMBED_WORKERS veya 1).
+        shared_index: True ise FAISS index'i, kimlik tablosu ve kategori bölümleri
+        önbellek dosyalarından mmap ile salt okunur açılır; aynı makinedeki
+        süreçler (Streamlit worker'ları) vektörlerin tek fiziksel kopyasını
+        paylaşır. Verilmezse CHATBOT_SHARED_INDEX=1 ile açılır; cache_dir gerektirir.
+        data_path: yanında aynı adlı .jsonl varsa o kullanılır; kayıtlar
+        bellekte tutulmaz, cevap anında ofset index'i ile diskten okunur.
+        trace_path: verilirse (veya CHATBOT_TRACE_LOG tanımlıysa) her istek aşama
+        süreleriyle birlikte bu JSONL dosyasına yazılır.
+        """
         print(" Chatbot başlatılıyor...")
+        # Açılış aşamalarının süreleri (sn): load, model, embed, index
+        self.startup_timings = {}
         
-        # API key kontrolü
-        if not os.getenv("GOOGLE_API_KEY"):
-            raise ValueError("❌ GOOGLE_API_KEY bulunamadı! .env dosyasını kontrol edin.")
+        # LLM başlat (Gemini için API key kontrolü burada yapılır)
+        self.llm = llm if llm is not None else create_llm(os.getenv("CHATBOT_LLM", "gemini"))
+        self.resilient = ResilientLLM(
+            self.llm, llm_timeout, llm_retries, hedge_after=hedge_after,
+            max_workers=llm_concurrency or int(os.getenv("CHATBOT_LLM_CONCURRENCY", LLM_CONCURRENCY)),
+        )
+        # fallback ve hızlı yol sayaçları Streamlit/sunucu thread'lerinden artırılır
+        self._counter_lock = threading.Lock()
+        self.fallback_count = 0
         
         # Veriyi yükle
         print(" Veri yükleniyor...")
-        with open(data_path, 'r', encoding='utf-8') as f:
-            self.data = json.load(f)
-        print(f" {len(self.data)} veri yüklendi")
+        start = time.perf_counter()
+        self.data_path = resolve_corpus_path(data_path)
+        self.corpus = CorpusStore(self.data_path)
+        print(f" {len(self.corpus)} veri yüklendi ({os.path.basename(self.data_path)})")
         
-        # Dökümanları hazırla
+        # Dökümanları hazırla: corpus tek geçişte okunur, metinler bellekte tutulmaz
         print(" Dökümanlar hazırlanıyor...")
-        documents = []
-        for item in self.data:
-            doc_text = f"Soru: {item['question']}\n\nCevap: {item['answer']}\n\nKategori: {item['category']}"
-            documents.append(doc_text)
+        if index_mode not in INDEX_MODES:
+            raise ValueError(f"Geçersiz index modu: {index_mode} (seçenekler: {', '.join(INDEX_MODES)})")
+        self.index_mode = index_mode
+        doc_ids = self._scan_corpus()
+        self.docstore = CorpusDocstore(
+            self.corpus, {doc_id: row for row, doc_id in enumerate(doc_ids)}, self._format_document
+        )
+        print(f" {len(doc_ids)} döküman, {len(self.answers)} farklı cevap ({index_mode} modu)")
+        self.startup_timings['load'] = time.perf_counter() - start
         
         # Embeddings oluştur
         print(" Embeddings oluşturuluyor...")
-        from langchain.embeddings import HuggingFaceEmbeddings
-        self.embeddings = HuggingFaceEmbeddings(
-           model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+        start = time.perf_counter()
+        self.embedding_backend = embedding_backend or os.getenv("CHATBOT_EMBEDDINGS", "torch")
+        self.embeddings = create_embeddings(self.embedding_backend)
+        self.embedder = BatchEmbedder(
+            self.embeddings, self.embedding_backend, batch_size=embed_batch_size,
+            workers=embed_workers or int(os.getenv("CHATBOT_EMBED_WORKERS", "1")),
         )
+        # Son embedding geçişinin hızı (döküman/sn)
+        self.embed_rate = 0.0
+        self.startup_timings['model'] = time.perf_counter() - start
         
-        # FAISS vector store oluştur
+        # FAISS vector store: önbellekte varsa yükle, yoksa oluştur ve kaydet
         print(" Vector database oluşturuluyor...")
-        self.vectorstore = FAISS.from_texts(documents, self.embeddings)
+        self.index_factory = index_factory
+        self.search_params = search_params or {}
+        if shared_index is None:
+            shared_index = os.getenv("CHATBOT_SHARED_INDEX", "0") == "1"
+        if shared_index and not cache_dir:
+            print(" Paylaşımlı index için cache_dir gerekli; index süreç belleğine yüklenecek")
+            shared_index = False
+        self.shared_index = shared_index
+        if cache_dir:
+            variant = f"{index_mode}-{self.embedding_backend}"
+            if index_factory != 'Flat':
+                variant += "-" + re.sub(r'\W+', '_', index_factory)
+            cache_dir = os.path.join(cache_dir, variant)
+        self.index_dir = cache_dir
+        self.vectorstore = self._load_or_build_index(doc_ids, file_hash(self.data_path), cache_dir)
+        self.partitions = None
+        if partitions:
+            start = time.perf_counter()
+            self.partitions = self._load_partitions(cache_dir)
+            self.startup_timings['partitions'] = time.perf_counter() - start
+            sizes = ", ".join(f"{c}: {n}" for c, n in self.partitions.stats()['sizes'].items())
+            print(f" Kategori bölümleri hazır ({sizes})")
         print(" Vector database hazır!")
         
-
-        # LLM başlat
-        self.llm = GoogleGenerativeAI(
-            model="gemini-2.5-flash", 
-            temperature=0.3,
-            google_api_key=os.getenv("GOOGLE_API_KEY")
-        )
+        # Türkçe normalizasyonlu BM25 index'i (FAISS ile aynı döküman kimlikleri)
+        if retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Geçersiz retrieval modu: {retrieval} (seçenekler: {', '.join(RETRIEVAL_MODES)})")
+        self.lexical = None
+        if retrieval == 'hybrid':
+            start = time.perf_counter()
+            self.lexical = BM25Index(doc_ids, (text for text, _ in self._iter_documents()))
+            self.startup_timings['lexical'] = time.perf_counter() - start
+            print(f" BM25 index hazır ({len(self.lexical.idf)} terim)")
+        self.fast_path_count = 0
         
         # Custom prompt template
         template = """Sen Akbank'ın yapay zeka destekli finansal asistanısın. Kullanıcılara finansal okur yazarlık konusunda yardımcı oluyorsun ve bankacılık sorunlarına çözüm üretiyorsun.
@@ -72,31 +314,735 @@ Yanıt kuralları:
 
 Yanıt:"""
 
-        PROMPT = PromptTemplate(
+        self.prompt = PromptTemplate(
             template=template,
             input_variables=["context", "question"]
         )
+        self.context = ContextAssembler(context_budget)
         
-        # RAG chain oluştur
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=self.vectorstore.as_retriever(
-                search_kwargs={"k": 3}  # En yakın 3 döküman
-            ),
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": PROMPT}
-        )
+        # Anlamsal cevap önbelleği
+        if answer_cache is True:
+            answer_cache = SemanticCache()
+        self.answer_cache = answer_cache or None
+        # Hesaplama ve SSS sorularını LLM'e gitmeden cevaplar
+        self.router = IntentRouter(self.faq)
+        # Sabit prompt'lar için önceden hesaplanmış cevaplar (bkz. warm_up)
+        self.precomputed = PrecomputedAnswers()
+        # Eşzamanlı aynı soruları tek hesaplamada birleştirir
+        self.inflight = SingleFlight()
+        
+        # Aşama bazında gecikme ölçümü ve isteğe bağlı iz kaydı
+        self.latency = LatencyRecorder()
+        # LLM'e gönderilen yaklaşık token sayıları (input: tüm prompt, context: bağlam)
+        self.tokens = LatencyRecorder()
+        trace_path = trace_path or os.getenv("CHATBOT_TRACE_LOG")
+        self.trace = TraceLog(trace_path) if trace_path else None
         
         print(" Chatbot hazır! Sorularınızı sorabilirsiniz.\n")
     
-    def ask(self, question):
-        """Soru sor ve cevap al"""
+    def _format_document(self, item):
+        return format_document(item, self.index_mode)
+
+    def _iter_documents(self):
+        """Corpus'u akış halinde okuyup (metin, metadata) çiftleri üretir"""
+        for item in self.corpus:
+            yield self._format_document(item)
+
+    def _scan_corpus(self):
+        """Döküman kimliklerini, cevap tablosunu (self.answers), kayıtların
+        kategorilerini ve yönlendiricinin SSS sorularını (self.faq) tek geçişte çıkarır"""
+        self.answers = {}
+        self.faq = {}
+        # Kayıt sırasına göre kategori kodu; metadata filtresi corpus'u okumadan uygulanır
+        self.categories = []
+        codes = []
+
+        def documents():
+            for item in self.corpus:
+                text, metadata = self._format_document(item)
+                self.answers.setdefault(metadata['answer_id'], {
+                    'answer': item['answer'],
+                    'category': item['category'],
+                    'source': item.get('source'),
+                })
+                if item['category'] in FAQ_CATEGORIES:
+                    self.faq[item['question']] = item['answer']
+                if item['category'] not in self.categories:
+                    self.categories.append(item['category'])
+                codes.append(self.categories.index(item['category']))
+                yield text, metadata
+
+        doc_ids = document_ids(documents())
+        self.row_categories = np.asarray(codes, dtype=np.int16)
+        return doc_ids
+
+    def _load_or_build_index(self, doc_ids, data_hash, cache_dir):
+        """Kayıtlı index'i yükler; yalnızca değişen dökümanları yeniden embed eder.
+
+        Model veya şablon değiştiyse index baştan oluşturulur. Veri dosyası
+        değiştiyse yeni/değişen dökümanlar eklenir, silinenler index'ten çıkarılır.
+        Paylaşımlı modda güncelleme bellekteki kopya üzerinde yapılır, kaydedilir
+        ve index dosyadan mmap ile yeniden açılır.
+        """
+        start = time.perf_counter()
+        self.startup_timings['embed'] = 0.0
+        template = DOC_TEMPLATE if self.index_mode == 'full' else QUESTION_TEMPLATE
+        cache_key = index_cache_key(
+            model_name=f"{EMBEDDING_MODEL}:{self.embedding_backend}", template=template,
+            index_mode=self.index_mode, index_factory=self.index_factory
+        )
+        manifest_path = os.path.join(cache_dir, 'manifest.json') if cache_dir else None
+
+        vectorstore = None
+        if cache_dir and os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+                if manifest.get('key') == cache_key:
+                    up_to_date = manifest.get('data_hash') == data_hash
+                    if up_to_date and self.shared_index and strings_exist(os.path.join(cache_dir, IDS_FILE)):
+                        vectorstore = self._open_shared(cache_dir)
+                        self.index_manifest = manifest
+                        self.startup_timings['index'] = time.perf_counter() - start
+                        print(f" Index önbellekten mmap ile açıldı (cache hit, paylaşımlı, "
+                              f"{self.startup_timings['index']:.2f} sn)")
+                        return vectorstore
+                    vectorstore = FAISS.load_local(cache_dir, self.embeddings, **_load_local_kwargs())
+                    vectorstore.docstore = self.docstore
+                    apply_search_params(vectorstore.index, self.search_params)
+                    # Paylaşımlı modda kimlik tablosu olmayan eski önbellek yeniden kaydedilir
+                    if up_to_date and not self.shared_index:
+                        self.index_manifest = manifest
+                        self.startup_timings['index'] = time.perf_counter() - start
+                        print(f" Index önbellekten yüklendi (cache hit, {self.startup_timings['index']:.2f} sn)")
+                        return vectorstore
+                else:
+                    print(" Embedding modeli veya şablon değişmiş; index yeniden oluşturulacak")
+            except Exception as e:
+                print(f" Index önbelleği okunamadı ({e}), yeniden oluşturuluyor...")
+                vectorstore = None
+
+        if vectorstore is not None:
+            # Artımlı güncelleme: döküman kimlikleri içerik özetidir
+            stored_ids = set(vectorstore.index_to_docstore_id.values())
+            current_ids = set(doc_ids)
+            removed = [i for i in stored_ids if i not in current_ids]
+            added = [n for n, i in enumerate(doc_ids) if i not in stored_ids]
+            if removed:
+                if isinstance(faiss.downcast_index(vectorstore.index), faiss.IndexFlatCodes):
+                    vectorstore.delete(removed)
+                else:
+                    # HNSW silmeyi desteklemez; IVF ise silinen konumları sıkıştırmadığı
+                    # için langchain'in kimlik eşlemesi bozulur
+                    print(f" {self.index_factory} index'inden silme yapılamıyor, yeniden oluşturuluyor...")
+                    vectorstore = None
+        if vectorstore is not None:
+            if added:
+                offset = vectorstore.index.ntotal
+                texts = (self._format_document(self.corpus.get(n))[0] for n in added)
+                for vectors in self._embed_batches(texts, len(added)):
+                    vectorstore.index.add(vectors)
+                vectorstore.index_to_docstore_id.update(
+                    {offset + i: doc_ids[n] for i, n in enumerate(added)}
+                )
+            mode = f"incremental, +{len(added)} / -{len(removed)} döküman"
+        else:
+            index = self._build_index(len(doc_ids))
+            vectorstore = FAISS(self.embeddings, index, self.docstore, dict(enumerate(doc_ids)))
+            mode = f"rebuild, {self.index_factory}"
+
+        self.index_manifest = {'key': cache_key, 'data_hash': data_hash, 'documents': len(doc_ids)}
+        if cache_dir:
+            self._save_index(vectorstore, cache_dir, self.index_manifest)
+            if self.shared_index:
+                # Bellekteki kopya bırakılır; süreçler dosyayı paylaşır
+                vectorstore = self._open_shared(cache_dir)
+        elapsed = time.perf_counter() - start
+        self.startup_timings['index'] = elapsed - self.startup_timings['embed']
+        print(f" Index güncellendi ({mode}, {elapsed:.2f} sn, embedding {self.startup_timings['embed']:.2f} sn)")
+        return vectorstore
+
+    def _embed_batches(self, texts, total):
+        """Metinleri batch'ler halinde embed eder ve float32 matrisler üretir.
+
+        Yalnızca embedding'i bekleme süresi açılış ölçümlerine eklenir; ilerleme
+        ve hız (döküman/sn) yazdırılır.
+        """
+        started = time.perf_counter()
+        done, reported = 0, 0
+        wait_start = started
+        for vectors in self.embedder.embed(texts):
+            self.startup_timings['embed'] += time.perf_counter() - wait_start
+            done += len(vectors)
+            self.embed_rate = done / max(time.perf_counter() - started, 1e-9)
+            if done - reported >= PROGRESS_EVERY and done < total:
+                reported = done
+                print(f" {done}/{total} döküman embed edildi ({self.embed_rate:.0f} dok/sn)")
+            yield vectors
+            wait_start = time.perf_counter()
+        if done:
+            print(f" {done} döküman embed edildi ({self.embed_rate:.0f} dok/sn, "
+                  f"{self.embedder.workers} süreç, batch {self.embedder.batch_size})")
+
+    def _build_index(self, total):
+        """Corpus'u akış halinde embed edip batch'ler geldikçe index'e ekler.
+
+        Eğitim gerektiren index'ler (IVF, PQ) için ilk TRAIN_SAMPLE_SIZE vektör
+        bekletilir; index eğitilince bunlar eklenir ve akış devam eder. Böylece
+        bellekte hiçbir zaman tüm corpus'un vektörleri tutulmaz.
+        """
+        index, pending, buffered = None, [], 0
+        texts = (text for text, _ in self._iter_documents())
+        for vectors in self._embed_batches(texts, total):
+            if index is not None:
+                index.add(vectors)
+                continue
+            pending.append(vectors)
+            buffered += len(vectors)
+            needs_training = not faiss.index_factory(vectors.shape[1], self.index_factory).is_trained
+            if not needs_training or buffered >= TRAIN_SAMPLE_SIZE:
+                index = self._start_index(pending)
+                pending = []
+        if index is None:
+            if not pending:
+                raise ValueError("Index oluşturmak için döküman bulunamadı")
+            index = self._start_index(pending)
+        return index
+
+    def _start_index(self, batches):
+        sample = np.concatenate(batches)
+        index = build_faiss_index(sample[:TRAIN_SAMPLE_SIZE], self.index_factory, self.search_params)
+        index.add(sample)
+        return index
+
+    @staticmethod
+    def _save_index(vectorstore, cache_dir, manifest):
+        """Index'i, kimlik tablosunu ve manifest'i kaydeder; manifest en son yazılır.
+
+        Döküman metinleri corpus dosyasında durduğu için pickle'a yalnızca
+        kimlik eşlemesi yazılır (boş docstore ile). Kimlikler ayrıca mmap ile
+        açılabilen bir tabloya yazılır. Dosyalar geçici dizinde oluşturulup
+        yerine taşınır; index'i mmap ile açmış süreçler eski dosyayı okumaya devam eder.
+        """
+        manifest_path = os.path.join(cache_dir, 'manifest.json')
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=cache_dir, prefix='.save-')
+        try:
+            FAISS(
+                vectorstore.embedding_function, vectorstore.index, InMemoryDocstore(), vectorstore.index_to_docstore_id
+            ).save_local(tmp_dir)
+            for name in os.listdir(tmp_dir):
+                os.replace(os.path.join(tmp_dir, name), os.path.join(cache_dir, name))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        id_map = vectorstore.index_to_docstore_id
+        write_strings(os.path.join(cache_dir, IDS_FILE), (id_map[i] for i in range(vectorstore.index.ntotal)))
+        # Yarım kalan kayıt manifest'siz kalır ve bir sonraki açılışta yeniden oluşturulur
+        tmp_path = manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, manifest_path)
+
+    def _doc_category(self, doc_id):
+        return self.categories[self.row_categories[self.docstore.doc_rows[doc_id]]]
+
+    def _open_shared(self, cache_dir):
+        """Kayıtlı index'i ve kimlik tablosunu mmap ile salt okunur açar"""
+        index = read_index_mmap(os.path.join(cache_dir, INDEX_FILE))
+        apply_search_params(index, self.search_params)
+        return FAISS(self.embeddings, index, self.docstore, StringTable(os.path.join(cache_dir, IDS_FILE)))
+
+    def _build_partitions(self, index):
+        """Ana index'ten kategori bazlı alt index'leri kurar"""
+        id_map = self.vectorstore.index_to_docstore_id
+        position_categories = [self._doc_category(id_map[i]) for i in range(index.ntotal)]
+        return PartitionedIndex.build(
+            index, position_categories,
+            # Küçük bölümler Flat kurulur; nprobe/efSearch yalnızca ana index tipine uygulanır
+            lambda vectors, factory: build_faiss_index(
+                vectors, factory, self.search_params if factory == self.index_factory else None
+            ),
+            self.index_factory,
+        )
+
+    def _load_partitions(self, cache_dir):
+        """Kategori bölümlerini kurar; paylaşımlı modda diske yazılmış bölümleri mmap ile açar"""
+        if not self.shared_index:
+            return self._build_partitions(self.vectorstore.index)
+        path = os.path.join(cache_dir, PARTITIONS_DIR)
+        partitions = PartitionedIndex.load(path, self.index_manifest)
+        if partitions is None:
+            # mmap ile açılmış IVF index'inden vektör geri çıkarılamaz; bir kez normal okunur
+            index = faiss.read_index(os.path.join(cache_dir, INDEX_FILE))
+            self._build_partitions(index).save(path, self.index_manifest)
+            del index
+            partitions = PartitionedIndex.load(path, self.index_manifest)
+        return partitions
+
+    def validate_filter(self, filter):
+        """Filtreyi doğrular ve {alan: sıralı değer listesi} biçimine getirir.
+
+        Değerler tek bir metin veya metinlerden oluşan liste (tuple/set) olabilir;
+        aksi halde veya kategori bilinmiyorsa ValueError.
+        """
+        if filter is None:
+            return None
+        if not isinstance(filter, dict) or not all(isinstance(key, str) for key in filter):
+            raise ValueError("filter {'alan': değer veya [değerler]} biçiminde olmalı")
+        normalized = {}
+        for key, value in filter.items():
+            values = [value] if isinstance(value, str) else value
+            if not isinstance(values, (list, tuple, set, frozenset)) or not all(isinstance(v, str) for v in values):
+                raise ValueError(f"filter['{key}'] bir metin veya metin listesi olmalı")
+            normalized[key] = sorted(set(values))
+        unknown = set(normalized.get('category', ())) - set(self.categories)
+        if unknown:
+            raise ValueError(f"Bilinmeyen kategori: {', '.join(sorted(unknown))} "
+                             f"(seçenekler: {', '.join(self.categories)})")
+        return normalized
+
+    def _split_filter(self, filter):
+        """Filtreyi (alt index'lerle aranacak kategoriler veya None, sonuçlarda kontrol
+        edilecek metadata koşulları) olarak ayırır. Değerler tek bir değer veya liste olabilir."""
+        if not filter:
+            return None, {}
+        conditions = {key: set(values) for key, values in self.validate_filter(filter).items()}
+        categories = None
+        if self.partitions is not None and 'category' in conditions:
+            categories = sorted(conditions['category'])
+        return categories, conditions
+
+    def _dense_search(self, query_vector, k, categories=None):
+        """FAISS'ten en yakın k dökümanın kimliklerini sırayla döndürür.
+
+        categories verilirse yalnızca o kategorilerin alt index'lerinde aranır.
+        """
+        if categories:
+            positions = self.partitions.search(query_vector, k, categories)
+        else:
+            vector = np.asarray([query_vector], dtype=np.float32)
+            _, indices = self.vectorstore.index.search(vector, k)
+            positions = [i for i in indices[0] if i != -1]
+        return [self.vectorstore.index_to_docstore_id[i] for i in positions]
+
+    def _to_documents(self, ranked_ids, k, conditions=None):
+        """Sıralı döküman kimliklerinden ilk k dökümanı üretir.
+
+        conditions verilirse metadata'sı uymayan dökümanlar atlanır. dedup
+        modunda kimlikler cevaba göre gruplanır; her cevap en üst sıradaki
+        sorusuyla birlikte tek döküman olarak verilir.
+        """
+        docstore = self.vectorstore.docstore
+        conditions = dict(conditions or {})
+        categories = conditions.pop('category', None)
+        if categories:
+            # Kategori corpus okunmadan kontrol edilir
+            ranked_ids = [doc_id for doc_id in ranked_ids if self._doc_category(doc_id) in categories]
+        if self.index_mode != 'dedup' and not conditions:
+            return [docstore.search(doc_id) for doc_id in ranked_ids[:k]]
+
+        groups = OrderedDict()
+        for doc_id in ranked_ids:
+            doc = docstore.search(doc_id)
+            if any(doc.metadata.get(key) not in values for key, values in conditions.items()):
+                continue
+            groups.setdefault(doc.metadata['answer_id'] if self.index_mode == 'dedup' else doc_id, doc)
+            if len(groups) >= k:
+                break
+        if self.index_mode != 'dedup':
+            return list(groups.values())
+        docs = []
+        for aid, doc in groups.items():
+            entry = self.answers[aid]
+            docs.append(Document(
+                page_content=DOC_TEMPLATE.format(
+                    question=doc.page_content, answer=entry['answer'], category=entry['category']
+                ),
+                metadata=doc.metadata
+            ))
+        return docs
+
+    def retrieve(self, query_vector, k=RETRIEVAL_K, lexical_hits=None, filter=None):
+        """Soru vektörüne en yakın k dökümanı döndürür.
+
+        lexical_hits verilirse FAISS ve BM25 sıralamaları reciprocal rank
+        fusion ile birleştirilir. filter ({'category': 'banking'}, {'source':
+        [...]} gibi) verilirse yalnızca uyan dökümanlar döner; kategori bölümleri
+        varsa yalnızca ilgili alt index'lerde aranır. dedup modunda veya filtre
+        varken k sonuç dönene kadar aday sayısı artırılır.
+        """
+        categories, conditions = self._split_filter(filter)
+        total = self.partitions.size(categories) if categories else self.vectorstore.index.ntotal
+        fused = lexical_hits is not None
+        if fused and 'category' in conditions:
+            lexical_hits = [hit for hit in lexical_hits if self._doc_category(hit[0]) in conditions['category']]
+        fetch_k = k * CANDIDATE_FACTOR if fused or conditions or self.index_mode == 'dedup' else k
+        while True:
+            ranked = self._dense_search(query_vector, min(fetch_k, total), categories)
+            if fused:
+                ranked = reciprocal_rank_fusion([ranked, [doc_id for doc_id, _ in lexical_hits]])
+            docs = self._to_documents(ranked, k, conditions)
+            if len(docs) >= k or fetch_k >= total:
+                return docs
+            fetch_k *= 4
+
+    def _prepare(self, question, timings, filter=None):
+        """Yönlendiriciye, hazır cevaplara ve önbelleğe bakar, gerekirse retrieval yapar.
+
+        Aşama sürelerini `timings` sözlüğüne yazar ve (hazır cevap veya None,
+        cevabın kaynağı, soru vektörü, dökümanlar) döndürür. Hesaplama ve SSS
+        soruları 'calculator'/'faq' kaynağıyla yerel olarak cevaplanır. Kısa ve
+        BM25 güveni yüksek sorgularda embedding atlanır; soru vektörü None döner.
+        filter verilirse yerel cevaplar ve önbellek atlanır.
+        """
+        explicit = filter is not None
+        if not explicit:
+            start = time.perf_counter()
+            routed = self.router.route(question)
+            timings['route'] = time.perf_counter() - start
+            if routed is not None:
+                return routed[0], routed[1], None, []
+
+            precomputed = self.precomputed.get(question)
+            if precomputed is not None:
+                return precomputed, 'precomputed', None, []
+        return self._search(question, timings, filter, use_cache=not explicit)
+
+    def _search(self, question, timings, filter=None, use_cache=True):
+        """_prepare'in retrieval aşaması; dönüş değeri _prepare'inkiyle aynıdır.
+
+        filter verilmezse soru tek bir kategoriye sınıflandırılabildiğinde
+        arama route_categories'in seçtiği bölümlerle sınırlanır. use_cache
+        False ise önbelleğe bakılmaz.
+        """
+        if filter is None and self.partitions is not None:
+            categories = route_categories(question, self.partitions.categories)
+            self.partitions.count(categories)
+            filter = {'category': categories} if categories else None
+
+        lexical_hits = None
+        if self.lexical is not None:
+            start = time.perf_counter()
+            lexical_hits = self.lexical.search(question, RETRIEVAL_K * CANDIDATE_FACTOR)
+            timings['lexical'] = time.perf_counter() - start
+            if (len(question.split()) <= LEXICAL_FAST_PATH_TERMS
+                    and self.lexical.confidence(question, lexical_hits) >= LEXICAL_FAST_PATH_CONFIDENCE):
+                _, conditions = self._split_filter(filter)
+                docs = self._to_documents([doc_id for doc_id, _ in lexical_hits], RETRIEVAL_K, conditions)
+                if docs:
+                    with self._counter_lock:
+                        self.fast_path_count += 1
+                    return None, None, None, docs
+
+        # Soru vektörü hem önbellek araması hem retrieval için bir kez hesaplanır
+        start = time.perf_counter()
+        query_vector = self.embeddings.embed_query(question)
+        timings['embed'] = time.perf_counter() - start
+        if self.answer_cache is not None and use_cache:
+            start = time.perf_counter()
+            cached = self.answer_cache.get(query_vector)
+            timings['cache'] = time.perf_counter() - start
+            if cached is not None:
+                return cached, 'cache', query_vector, []
+        start = time.perf_counter()
+        docs = self.retrieve(query_vector, lexical_hits=lexical_hits, filter=filter)
+        timings['search'] = time.perf_counter() - start
+        return None, None, query_vector, docs
+
+    def _passage(self, doc):
+        """Dökümandan bağlama girecek (soru, cevap) çiftini çıkarır"""
+        question = self.corpus.get(doc.metadata['row']).get('question')
+        return question, self.answers[doc.metadata['answer_id']]['answer']
+
+    def _build_prompt(self, question, docs, timings, usage=None):
+        """Dökümanlardan token bütçeli bağlamı kurar ve prompt'a yerleştirir.
+
+        usage verilirse prompt'un ve bağlamın yaklaşık token sayıları yazılır.
+        """
+        start = time.perf_counter()
+        context, info = self.context.assemble(question, [self._passage(doc) for doc in docs])
+        prompt = self.prompt.format(context=context, question=question)
+        timings['prompt'] = time.perf_counter() - start
+        if usage is not None:
+            usage['input'] = estimate_tokens(prompt)
+            usage['context'] = info['context_tokens']
+        return prompt
+
+    def _fallback(self, docs):
+        """En üst sıradaki dökümanın kayıtlı cevabı; döküman yoksa None"""
+        if not docs:
+            return None
+        with self._counter_lock:
+            self.fallback_count += 1
+        return FALLBACK_NOTE + self.answers[docs[0].metadata['answer_id']]['answer']
+
+    def _complete(self, prompt, docs, timings):
+        """LLM cevabını üretir; süre dolar veya çağrı başarısız olursa kayıtlı
+        cevaba düşer. (cevap, sonuç türü) döndürür."""
+        start = time.perf_counter()
         try:
-            result = self.qa_chain({"query": question})
-            return result['result']
+            return self.resilient.invoke(prompt), 'llm'
         except Exception as e:
+            answer = self._fallback(docs)
+            if answer is None:
+                raise
+            print(f" LLM cevabı alınamadı ({e}); kayıtlı cevap kullanılıyor")
+            return answer, 'fallback'
+        finally:
+            timings['llm'] = time.perf_counter() - start
+
+    def _remember(self, question, query_vector, answer, filter=None):
+        # Filtreli cevaplar filtresiz sorulara dönmesin diye önbelleğe yazılmaz
+        if filter is None and self.answer_cache is not None and answer and query_vector is not None:
+            self.answer_cache.put(question, query_vector, answer)
+
+    def _record(self, question, timings, started, outcome, usage=None):
+        """İsteğin aşama sürelerini ve token sayılarını histograma ve (açıksa) iz kaydına yazar"""
+        timings['total'] = time.perf_counter() - started
+        self.latency.record(timings)
+        if usage:
+            self.tokens.record(usage)
+        if self.trace is not None:
+            event = {
+                'ts': time.time(),
+                'question': question,
+                'outcome': outcome,
+                'ms': {stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+            }
+            if usage:
+                event['tokens'] = usage
+            self.trace.write(event)
+
+    def stats(self):
+        """Aşama gecikmeleri (sn) ve önbellek sayaçları"""
+        stats = {
+            'latency': self.latency.summary(),
+            'precomputed': self.precomputed.stats(),
+            'lexical_fast_path': self.fast_path_count,
+            'router': self.router.stats(),
+            'coalesced': self.inflight.stats(),
+            'llm': dict(self.resilient.stats(), fallbacks=self.fallback_count),
+            'tokens': self.tokens.summary(),
+            'index': {
+                'factory': self.index_factory,
+                'shared': self.shared_index,
+                'documents': self.vectorstore.index.ntotal,
+                'bytes': self._index_bytes(),
+            },
+        }
+        if self.answer_cache is not None:
+            stats['answer_cache'] = self.answer_cache.stats()
+        if self.partitions is not None:
+            stats['partitions'] = self.partitions.stats()
+        return stats
+
+    def _generate(self, question):
+        """Önbellekleri atlayarak retrieval + LLM ile cevap üretir; hataları fırlatır.
+
+        Dökümanlar sohbetteki yoldan (BM25 füzyonu, bölüm yönlendirmesi) gelir.
+        """
+        _, _, _, docs = self._search(question, {}, use_cache=False)
+        return self.resilient.invoke(self._build_prompt(question, docs, {}))
+
+    def warm_up(self, prompts, refresh_interval=None):
+        """Sabit prompt'ların cevaplarını arka planda önceden hesaplar.
+
+        refresh_interval (sn) verilirse cevaplar periyodik olarak yenilenir;
+        geçerlilik süresi self.precomputed.ttl ile belirlenir. Yönlendiricinin
+        yerel olarak cevapladığı prompt'lar için LLM çağrılmaz.
+        """
+        prompts = [p for p in prompts if self.router.match(p) is None]
+        self.precomputed.start(self._generate, prompts, refresh_interval)
+
+    def _index_bytes(self):
+        if self.shared_index:
+            # mmap'li index serileştirilirse süreç belleğine kopyalanır; dosya boyutu kullanılır
+            return os.path.getsize(os.path.join(self.index_dir, INDEX_FILE))
+        # serileştirme büyük index'lerde pahalı; döküman sayısı değişmedikçe tekrar hesaplanmaz
+        ntotal = self.vectorstore.index.ntotal
+        if getattr(self, '_index_size', (None, 0))[0] != ntotal:
+            self._index_size = (ntotal, index_memory_bytes(self.vectorstore.index))
+        return self._index_size[1]
+
+    def _flight_key(self, question, filter):
+        """Birleştirme anahtarı; farklı filtreli aynı sorular birleştirilmez.
+
+        Geçersiz filtrede validate_filter'ın ValueError'ı yükselir.
+        """
+        key = question_key(question)
+        if filter is None:
+            return key
+        return key + " " + json.dumps(self.validate_filter(filter), sort_keys=True, ensure_ascii=False)
+
+    def ask(self, question, filter=None):
+        """Soru sor ve cevap al.
+
+        filter ({'category': 'banking'}, {'source': [...]} gibi) verilirse
+        yalnızca uyan dökümanlar bağlama girer. Aynı (normalize edilmiş) soru o
+        anda başka bir oturumda hesaplanıyorsa ayrı bir retrieval/LLM çağrısı
+        yapılmaz, süren hesaplamanın sonucu beklenir.
+        """
+        try:
+            key = self._flight_key(question, filter)
+        except ValueError as e:
             return f" Hata oluştu: {str(e)}"
+        try:
+            return self.inflight.do(key, self._ask, question, filter)
+        except Exception:
+            # Birleştirilen hesaplama yarıda kaldı (iptal edilen akış vb.); yeniden hesaplanır
+            return self._ask(question, filter)
+
+    def _ask(self, question, filter=None):
+        started = time.perf_counter()
+        timings, usage, outcome = {}, {}, 'error'
+        try:
+            cached, source, query_vector, docs = self._prepare(question, timings, filter)
+            if cached is not None:
+                outcome = source
+                return cached
+            prompt = self._build_prompt(question, docs, timings, usage)
+            answer, outcome = self._complete(prompt, docs, timings)
+            if outcome == 'llm':
+                self._remember(question, query_vector, answer, filter)
+            return answer
+        except Exception as e:
+            return f" Hata oluştu: {str(e)}"
+        finally:
+            self._record(question, timings, started, outcome, usage)
+
+    async def ask_async(self, question, executor=None, llm_slots=None, filter=None):
+        """ask'in asyncio sürümü; event loop'u bloklamaz.
+
+        Retrieval ve LLM çağrısı `executor` thread havuzunda çalışır. llm_slots
+        (asyncio.Semaphore) verilirse eşzamanlı LLM çağrıları sınırlanır; slot,
+        istek iptal edilse bile çağrı gerçekten bitince serbest bırakılır.
+        Eşzamanlı aynı sorular ask'teki gibi birleştirilir.
+        """
+        try:
+            key = self._flight_key(question, filter)
+        except ValueError as e:
+            return f" Hata oluştu: {str(e)}"
+        future, leader = self.inflight.begin(key)
+        if not leader:
+            try:
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except Exception:
+                return await self._ask_async(question, executor, llm_slots, filter)
+        try:
+            answer = await self._ask_async(question, executor, llm_slots, filter)
+        except BaseException:
+            self.inflight.finish(key, future, error=RuntimeError("Birleştirilen istek iptal edildi"))
+            raise
+        self.inflight.finish(key, future, answer)
+        return answer
+
+    async def _ask_async(self, question, executor, llm_slots, filter=None):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        timings, usage, outcome = {}, {}, 'error'
+        try:
+            cached, source, query_vector, docs = await loop.run_in_executor(
+                executor, self._prepare, question, timings, filter
+            )
+            if cached is not None:
+                outcome = source
+                return cached
+            prompt = self._build_prompt(question, docs, timings, usage)
+            if llm_slots is not None:
+                await llm_slots.acquire()
+            future = loop.run_in_executor(executor, self._complete, prompt, docs, timings)
+            if llm_slots is not None:
+                future.add_done_callback(lambda _: llm_slots.release())
+            answer, outcome = await asyncio.shield(future)
+            if outcome == 'llm':
+                self._remember(question, query_vector, answer, filter)
+            return answer
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        except Exception as e:
+            return f" Hata oluştu: {str(e)}"
+        finally:
+            self._record(question, timings, started, outcome, usage)
+
+    def ask_stream(self, question, filter=None, llm_slot=None):
+        """Soru sor; cevabı LLM'den geldikçe parça parça döndüren generator.
+
+        Retrieval ilk parçadan önce tamamlanır, ardından model çıktısı token
+        token iletilir. Önbellekten gelen cevap tek parça olarak döner. Aynı
+        soru o anda hesaplanıyorsa onun sonucu beklenir ve tek parça döner.
+        llm_slot verilirse (context manager döndüren fonksiyon) yalnızca LLM
+        akışı süresince tutulur; yerel ve önbellekten gelen cevaplar slot almaz.
+        """
+        try:
+            key = self._flight_key(question, filter)
+        except ValueError as e:
+            yield f" Hata oluştu: {str(e)}"
+            return
+        future, leader = self.inflight.begin(key)
+        if not leader:
+            try:
+                answer = future.result()
+            except Exception:
+                yield from self._ask_stream(question, filter, llm_slot)
+                return
+            yield answer
+            return
+        parts, completed = [], False
+        try:
+            for chunk in self._ask_stream(question, filter, llm_slot):
+                parts.append(chunk)
+                yield chunk
+            completed = True
+        finally:
+            if completed:
+                self.inflight.finish(key, future, "".join(parts))
+            else:
+                self.inflight.finish(key, future, error=RuntimeError("Birleştirilen akış yarıda kaldı"))
+
+    def _ask_stream(self, question, filter=None, llm_slot=None):
+        started = time.perf_counter()
+        timings, usage, outcome = {}, {}, 'error'
+        try:
+            cached, source, query_vector, docs = self._prepare(question, timings, filter)
+            if cached is not None:
+                outcome = source
+                yield cached
+                return
+            prompt = self._build_prompt(question, docs, timings, usage)
+            with llm_slot() if llm_slot is not None else nullcontext():
+                start = time.perf_counter()
+                parts = []
+                try:
+                    for chunk in self.resilient.stream(prompt):
+                        if not parts:
+                            timings['first_token'] = time.perf_counter() - start
+                        parts.append(chunk)
+                        yield chunk
+                except Exception as e:
+                    # Akış başladıysa yarım cevabın ardına kayıtlı cevap yalnızca akış
+                    # takıldığında eklenir; diğer hatalar yarım cevapla bitirilmez
+                    stalled = bool(parts) and isinstance(e, StreamStalled)
+                    fallback = self._fallback(docs) if not parts or stalled else None
+                    if fallback is None:
+                        raise
+                    print(f" LLM cevabı alınamadı ({e}); kayıtlı cevap kullanılıyor")
+                    timings['llm'] = time.perf_counter() - start
+                    outcome = 'fallback'
+                    yield "\n\n" + fallback if stalled else fallback
+                    return
+                timings['llm'] = time.perf_counter() - start
+            self._remember(question, query_vector, "".join(parts), filter)
+            outcome = 'llm'
+        except asyncio.CancelledError:
+            outcome = 'cancelled'
+            raise
+        except Exception as e:
+            yield f" Hata oluştu: {str(e)}"
+        finally:
+            self._record(question, timings, started, outcome, usage)
     
     def chat(self):
         """Terminal'de sohbet et"""
@@ -113,9 +1059,9 @@ Yanıt:"""
                 continue
             
             print("🤖 Asistan: ", end="")
-            answer = self.ask(question)
-            print(answer)
-            print()
+            for chunk in self.ask_stream(question):
+                print(chunk, end="", flush=True)
+            print("\n")
 
 # Test fonksiyonu
 def test_chatbot():
@@ -0,0 +1,221 @@
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Bir LLM çağrısının (tekrar denemeler ve hedge dahil) toplam süre sınırı (sn)
+LLM_TIMEOUT = 20.0
+# Hata veren çağrı en fazla bu kadar tekrar denenir
+LLM_RETRIES = 2
+# Tekrar denemeler arası bekleme tabanı (sn); her denemede iki katına çıkar
+BACKOFF_BASE = 0.5
+# Aynı anda çalışabilecek LLM çağrısı; paylaşılan chatbot'un eşzamanlılık sınırı
+LLM_CONCURRENCY = 32
+# Akış başladıktan sonra iki parça arasında beklenecek en uzun süre (sn)
+STREAM_IDLE_TIMEOUT = 15.0
+# Sağlayıcı istisnalarında geçici hata sayılan sınıf adları ve HTTP kodları
+# (google.api_core ve benzerleri; paket zorunlu olmadığı için adla kontrol edilir)
+TRANSIENT_ERROR_NAMES = {
+    'ServiceUnavailable', 'TooManyRequests', 'ResourceExhausted', 'InternalServerError', 'DeadlineExceeded',
+    'GatewayTimeout', 'BadGateway', 'RetryError',
+}
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class StreamStalled(DeadlineExceeded):
+    """Akış başladıktan sonra sağlayıcı parça göndermeyi kesti"""
+
+
+def is_transient(error):
+    """Tekrar denemeye değer (zaman aşımı, bağlantı, kota/sunucu) hata mı?
+
+    ValueError, kimlik doğrulama gibi kalıcı hatalar tekrar denenmez.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    if type(error).__name__ in TRANSIENT_ERROR_NAMES:
+        return True
+    code = getattr(error, 'code', None) or getattr(error, 'status_code', None)
+    return isinstance(code, int) and code in TRANSIENT_STATUS_CODES
+
+
+class ResilientLLM:
+    """LLM çağrılarını süre sınırı, jitter'lı tekrar deneme ve hedge ile sarar.
+
+    Her çağrının tüm denemeler dahil `timeout` saniyelik bir süre sınırı
+    vardır; süre çağrı havuzda çalışmaya başladığında başlar, kuyrukta
+    bekleme sayılmaz (kuyruk beklemesi ayrıca `timeout` ile sınırlıdır).
+    Aşılırsa DeadlineExceeded fırlatılır. Geçici hatalar (bkz. is_transient)
+    `retries` kez, aralarında rastgele (full jitter) üstel beklemeyle tekrar
+    denenir. `hedge_after` verilirse o süre içinde cevap gelmeyen çağrıya
+    ayrı bir havuzdan ikinci istek eklenir ve önce biten kullanılır; hedge
+    havuzu doluysa hedge atlanır. Akışta parçalar arası bekleme
+    `idle_timeout` ile sınırlıdır.
+
+    max_workers: eşzamanlı çağrı sayısı; çağıranın eşzamanlılığına göre
+    seçilmelidir. executor verilirse havuz olarak o kullanılır. Zaman aşımına
+    uğrayan çağrılar iptal edilemez; havuzda arka planda biter.
+    """
+
+    def __init__(self, llm, timeout=LLM_TIMEOUT, retries=LLM_RETRIES, backoff=BACKOFF_BASE,
+                 hedge_after=None, max_workers=LLM_CONCURRENCY, executor=None, idle_timeout=STREAM_IDLE_TIMEOUT):
+        self.llm = llm
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_after = hedge_after
+        self.idle_timeout = idle_timeout
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm')
+        self.hedge_workers = max(1, max_workers // 4)
+        self.hedge_executor = None
+        if hedge_after is not None:
+            self.hedge_executor = ThreadPoolExecutor(max_workers=self.hedge_workers, thread_name_prefix='llm-hedge')
+        self._hedging = 0
+        self.counters = {
+            'calls': 0, 'retries': 0, 'hedged': 0, 'hedge_wins': 0, 'hedge_skipped': 0, 'timeouts': 0,
+        }
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def _backoff(self, attempt, deadline):
+        """Tekrar denemeden önce bekler; süre sınırını aşacaksa False döner"""
+        delay = random.uniform(0, self.backoff * 2 ** attempt)
+        if time.monotonic() + delay >= deadline:
+            return False
+        time.sleep(delay)
+        self._count('retries')
+        return True
+
+    def _start(self, fn, *args):
+        """fn'i havuza verir ve çalışmaya başlamasını bekler.
+
+        Havuz `timeout` sn içinde boşalmazsa çağrı iptal edilir ve
+        DeadlineExceeded fırlatılır.
+        """
+        started = threading.Event()
+
+        def run():
+            started.set()
+            return fn(*args)
+
+        future = self.executor.submit(run)
+        if not started.wait(self.timeout) and future.cancel():
+            raise DeadlineExceeded(f"LLM havuzunda {self.timeout:g} sn içinde boş yer açılmadı")
+        started.wait()
+        return future
+
+    def invoke(self, prompt):
+        """Cevap metnini döndürür; süre dolarsa DeadlineExceeded, denemeler tükenirse son hatayı fırlatır"""
+        self._count('calls')
+        deadline = None
+        for attempt in range(self.retries + 1):
+            try:
+                future = self._start(self.llm.invoke, prompt)
+                if deadline is None:
+                    deadline = time.monotonic() + self.timeout
+                return self._await(future, prompt, deadline)
+            except DeadlineExceeded:
+                self._count('timeouts')
+                raise
+            except Exception as e:
+                if not is_transient(e) or attempt == self.retries or not self._backoff(attempt, deadline):
+                    raise
+
+    def _hedge(self, prompt):
+        """Hedge havuzunda yer varsa ikinci isteği başlatır; yoksa None"""
+        with self._lock:
+            if self._hedging >= self.hedge_workers:
+                self.counters['hedge_skipped'] += 1
+                return None
+            self._hedging += 1
+            self.counters['hedged'] += 1
+        future = self.hedge_executor.submit(self.llm.invoke, prompt)
+        future.add_done_callback(self._hedge_done)
+        return future
+
+    def _hedge_done(self, _):
+        with self._lock:
+            self._hedging -= 1
+
+    def _await(self, first, prompt, deadline):
+        futures = {first}
+        hedge_at = time.monotonic() + self.hedge_after if self.hedge_after is not None else None
+        error = None
+        while futures:
+            now = time.monotonic()
+            if now >= deadline:
+                raise DeadlineExceeded(f"LLM {self.timeout:g} sn içinde cevap vermedi")
+            wait_until = min(deadline, hedge_at) if hedge_at is not None else deadline
+            done, futures = wait(futures, timeout=wait_until - now, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in futures:
+                        other.cancel()
+                    if future is not first:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+            if hedge_at is not None and time.monotonic() >= hedge_at and futures:
+                hedge = self._hedge(prompt)
+                if hedge is not None:
+                    futures.add(hedge)
+                hedge_at = None
+        raise error
+
+    def stream(self, prompt):
+        """Cevap parçalarını döndüren generator.
+
+        Süre sınırı ve tekrar denemeler ilk parçaya kadar geçerlidir; akış
+        başladıktan sonra iki parça arasında `idle_timeout` sn'den uzun
+        beklenirse StreamStalled fırlatılır. Akışta hedge yapılmaz.
+        """
+        self._count('calls')
+        deadline = None
+        for attempt in range(self.retries + 1):
+            chunks = queue.Queue()
+            try:
+                self._start(self._produce, prompt, chunks)
+            except DeadlineExceeded:
+                self._count('timeouts')
+                raise
+            if deadline is None:
+                deadline = time.monotonic() + self.timeout
+            try:
+                kind, value = chunks.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                self._count('timeouts')
+                raise DeadlineExceeded(f"LLM {self.timeout:g} sn içinde cevap vermedi")
+            if kind != 'error':
+                break
+            if not is_transient(value) or attempt == self.retries or not self._backoff(attempt, deadline):
+                raise value
+        while kind == 'chunk':
+            yield value
+            try:
+                kind, value = chunks.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                self._count('timeouts')
+                raise StreamStalled(f"LLM akışı {self.idle_timeout:g} sn boyunca parça göndermedi")
+        if kind == 'error':
+            raise value
+
+    def _produce(self, prompt, chunks):
+        try:
+            for chunk in self.llm.stream(prompt):
+                chunks.put(('chunk', chunk))
+        except Exception as e:
+            chunks.put(('error', e))
+        else:
+            chunks.put(('done', None))
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
@@ -0,0 +1,392 @@
+"""LLM'e gitmeden yerel olarak cevaplanabilen soruları yakalayan yönlendirici.
+
+İki tür soru yakalanır:
+- Hesaplama: "100.000 TL için 32 gün vadede %45 faizle net getiri ne kadar"
+  gibi parametreleri metinden okunabilen ve açıkça hesap isteyen mevduat,
+  birikim, borç ve kredi soruları calculator.py ile deterministik olarak
+  cevaplanır. Tavsiye ve kural soruları hesaplayıcıya gitmez.
+- SSS: finansal okuryazarlık sorularının (neredeyse) birebir tekrarları için
+  kayıtlı cevap döner.
+Geri kalan sorular normal retrieval + LLM akışına devam eder.
+"""
+import difflib
+import re
+import threading
+
+import numpy as np
+
+from calculator import (
+    MAX_MONTHS,
+    STOPAJ,
+    annuity_payment,
+    debt_payoff_months,
+    debt_total_interest,
+    deposit_net_return,
+    savings_months,
+)
+from lexical import normalize_tr
+from singleflight import question_key
+
+# Kayıtlı cevabı doğrudan dönecek kategoriler
+FAQ_CATEGORIES = ('financial_literacy',)
+# Kelime kelime karşılaştırmada farklı kelimeler için difflib benzerlik eşiği;
+# yalnızca yazım farkı olan tekrarlar yakalanır
+FAQ_MATCH_RATIO = 0.85
+# Farklı yazılabilecek en fazla kelime oranı (en az bir kelime)
+FAQ_MAX_TYPO_SHARE = 0.25
+# Olumsuzluk ekleri: "yapmaliyim" ile "yapmamaliyim" yazım farkı sayılmaz
+NEGATION_INFIXES = ('ma', 'me')
+# Duyarlılık tablosu için orana eklenen yüzde puanlar
+DEPOSIT_RATE_STEPS = (-10.0, -5.0, 0.0, 5.0, 10.0)
+CALCULATOR_NOTE = "\n\n_Bu sonuç yerel hesaplayıcıyla üretilmiştir; güncel oranlar için şubenize danışın._"
+
+# Sayılar normalize_tr sonrası metinde aranır: "100.000", "1.250,50", "2,5 milyon"
+_NUMBER = r"(\d{1,3}(?:\.\d{3})+(?:,\d+)?|\d+(?:[.,]\d+)?)"
+_AMOUNT_RE = re.compile(_NUMBER + r"\s*(bin|milyon)?\s*(?:tl|₺|lira)")
+_PERCENT_RE = re.compile(r"(?:%\s*|yuzde\s*)" + _NUMBER + r"|" + _NUMBER + r"\s*%")
+_DAYS_RE = re.compile(r"(\d+)\s*gun")
+# "%3 aylik" bir süre değil oranın dönemidir
+_MONTHS_RE = re.compile(r"(?<![%\d.,])(\d+)\s*(ay|yil)(?:da|lik|luk)?\b")
+_MONTHLY_AMOUNT_RE = re.compile(r"(?:aylik|her ay)\s*" + _AMOUNT_RE.pattern)
+_MULTIPLIERS = {'bin': 1e3, 'milyon': 1e6}
+_PERIODS = ('aylik', 'yillik')
+# Oranın neye ait olduğunu belirten kelimeler ve oranın etrafında bakılan kelime sayısı
+_RATE_WORDS = ('faiz', 'getiri')
+_RATE_CONTEXT_WORDS = _RATE_WORDS + ('stopaj',)
+_RATE_CONTEXT = 3
+_PUNCTUATION = ",.;:!?()"
+
+
+def _words_re(*stems):
+    """Kelime başında verilen köklerden biriyle eşleşen desen"""
+    return re.compile(r"\b(?:" + "|".join(stems) + ")")
+
+
+# Hesaplayıcı türleri kelime kökleriyle seçilir ("vadesiz" mevduat sorusu değildir)
+_DEPOSIT_RE = _words_re(r"mevduat", r"vade(?!siz)", r"stopaj")
+_SAVINGS_RE = _words_re(r"birik")
+_DEBT_RE = _words_re(r"borc")
+_LOAN_RE = _words_re(r"kredi(?!\s*(?:kart|not))")
+# Kullanıcının açıkça hesap istediğini gösteren ifadeler; soru türüne göre
+_CALCULATION_CUES = _words_re(r"hesapla", r"ne kadar", r"kac (?:tl|lira|para)")
+_DEPOSIT_CUES = _words_re(r"getiri", r"kazan", r"net (?:faiz|kazanc|tutar)")
+_DURATION_CUES = _words_re(r"kac (?:ay|yil)", r"ne zaman", r"ne kadar surede")
+_DEBT_CUES = _words_re(r"biter", r"kapan")
+_LOAN_CUES = _words_re(r"taksit", r"aylik odeme", r"geri odeme")
+# Tavsiye, karşılaştırma ve kural soruları hesap isteği sayılmaz
+_ADVICE_CUES = _words_re(r"mantikli", r"tavsiye", r"oner", r"yoksa", r"neden", r"avantaj", r"dezavantaj",
+                         r"fark", r"mi\b", r"mu\b")
+
+
+def _asks_calculation(text, *cues):
+    """Metin açıkça hesap istiyor ve tavsiye sorusu değilse True"""
+    if _ADVICE_CUES.search(text):
+        return False
+    return any(cue.search(text) for cue in (_CALCULATION_CUES,) + cues)
+
+
+class AmbiguousRate(ValueError):
+    """Metindeki oran veya oranın dönemi tek anlamlı okunamıyor; soru hesaplayıcıya yönlendirilmez"""
+
+
+def parse_number(text):
+    """Türkçe yazılmış sayıyı float'a çevirir: "100.000" -> 100000, "2,5" -> 2.5"""
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})+(?:,\d+)?", text):
+        text = text.replace(".", "")
+    return float(text.replace(",", "."))
+
+
+def format_tl(value):
+    """1234567.8 -> "1.234.567,80 TL" """
+    text = f"{value:,.2f}".replace(",", "_").replace(".", ",").replace("_", ".")
+    return f"{text} TL"
+
+
+def format_percent(rate):
+    return "%" + f"{rate * 100:.2f}".rstrip("0").rstrip(".").replace(".", ",")
+
+
+def _amounts(text):
+    return [parse_number(m.group(1)) * _MULTIPLIERS.get(m.group(2), 1) for m in _AMOUNT_RE.finditer(text)]
+
+
+def _words(text):
+    return [word.strip(_PUNCTUATION) for word in text.split()]
+
+
+def _period(before, after):
+    """Oranın hemen önünde ("yillik %45", "yillik faiz %45") veya arkasında
+    ("%12 yillik") yazan dönem. "%12 aylik 2.500 tl" gibi arkadan gelen dönem
+    tutara aittir. İki taraf çelişirse AmbiguousRate.
+    """
+    periods = set()
+    if before and before[-1] in _PERIODS:
+        periods.add(before[-1])
+    elif len(before) > 1 and before[-1].startswith(_RATE_WORDS) and before[-2] in _PERIODS:
+        periods.add(before[-2])
+    if after and after[0] in _PERIODS and not (len(after) > 1 and re.match(r"\d", after[1])):
+        periods.add(after[0])
+    if len(periods) > 1:
+        raise AmbiguousRate("oranın dönemi belirsiz")
+    return periods.pop() if periods else None
+
+
+def _label(before, after):
+    """Oranın etrafındaki en yakın faiz/getiri/stopaj kelimesi; iki yanda eşit uzaklıktaysa 'belirsiz'"""
+    def nearest(words):
+        for distance, word in enumerate(words[:_RATE_CONTEXT]):
+            for label in _RATE_CONTEXT_WORDS:
+                if word.startswith(label):
+                    return distance, label
+        return None
+
+    left, right = nearest(before[::-1]), nearest(after)
+    if left and right and left[0] == right[0] and left[1] != right[1]:
+        return 'belirsiz'
+    closest = min(filter(None, (left, right)), default=None)
+    return closest[1] if closest else None
+
+
+def _rates(text):
+    """Metindeki her yüzde için (oran, dönem, etiket) listesi"""
+    rates = []
+    for match in _PERCENT_RE.finditer(text):
+        before, after = _words(text[:match.start()]), _words(text[match.end():])
+        value = parse_number(match.group(1) or match.group(2)) / 100
+        rates.append((value, _period(before, after), _label(before, after)))
+    return rates
+
+
+def _percent(text):
+    """(oran, dönem) döndürür; dönem 'aylik', 'yillik' veya None.
+
+    Her oran en yakın faiz/getiri/stopaj kelimesine bağlanır ve stopaj
+    oranları atlanır. Bağlantı belirsizse veya geriye farklı birden fazla
+    oran kalırsa AmbiguousRate.
+    """
+    candidates = [rate for rate in _rates(text) if rate[2] != 'stopaj']
+    if any(rate[2] == 'belirsiz' for rate in candidates):
+        raise AmbiguousRate("oranın faize mi stopaja mı ait olduğu belirsiz")
+    distinct = set((rate[0], rate[1]) for rate in candidates)
+    if len(distinct) > 1:
+        raise AmbiguousRate("metinde birden fazla oran var")
+    return distinct.pop() if distinct else (None, None)
+
+
+def _months(text):
+    match = _MONTHS_RE.search(text)
+    if match is None:
+        return None
+    return int(match.group(1)) * (12 if match.group(2) == 'yil' else 1)
+
+
+def _split_monthly(text):
+    """(aylık tutar, diğer tutar) döndürür; ikisi de bulunamazsa None"""
+    monthly = _MONTHLY_AMOUNT_RE.search(text)
+    amounts = _amounts(text)
+    if monthly is None or len(amounts) < 2:
+        return None
+    monthly_value = parse_number(monthly.group(1)) * _MULTIPLIERS.get(monthly.group(2), 1)
+    others = list(amounts)
+    others.remove(monthly_value)
+    return monthly_value, others[0]
+
+
+def _monthly_rate(rate, period):
+    """Borç ve kredi oranları aksi belirtilmedikçe aylık kabul edilir"""
+    return rate / 12 if period == 'yillik' else rate
+
+
+def deposit_intent(text):
+    if not _DEPOSIT_RE.search(text) or not _asks_calculation(text, _DEPOSIT_CUES):
+        return None
+    amounts = _amounts(text)
+    days = _DAYS_RE.search(text)
+    if not amounts or days is None:
+        return None
+    principal, days = amounts[0], int(days.group(1))
+    rate, period = _percent(text)
+    # Oran verilmemişse varsayılan bir orandan hesap yapılmaz
+    if rate is None:
+        return None
+    if period == 'aylik':
+        raise AmbiguousRate("mevduat faizi yıllık verilmeli")
+    net = float(deposit_net_return(principal, rate, days))
+    gross = float(deposit_net_return(principal, rate, days, 0.0))
+    lines = [
+        f"**{format_tl(principal)}** için **{days} gün** vadede yıllık **{format_percent(rate)}** faizle:",
+        "",
+        f"- Brüt faiz: {format_tl(gross)}",
+        f"- Stopaj ({format_percent(STOPAJ)}): {format_tl(gross - net)}",
+        f"- **Net getiri: {format_tl(net)}** (vade sonu toplam {format_tl(principal + net)})",
+        "",
+        "Farklı oranlara duyarlılık:",
+        "",
+        "| Yıllık faiz | Net getiri |",
+        "|---|---|",
+    ]
+    rates = np.maximum(rate * 100 + np.array(DEPOSIT_RATE_STEPS), 0) / 100
+    for r, value in zip(rates, deposit_net_return(principal, rates, days)):
+        lines.append(f"| {format_percent(r)} | {format_tl(value)} |")
+    lines.append("")
+    lines.append("Hesap basit faizle ve yılı 365 gün kabul ederek yapılmıştır.")
+    return "\n".join(lines)
+
+
+def savings_intent(text):
+    if not _SAVINGS_RE.search(text) or not _asks_calculation(text, _DURATION_CUES):
+        return None
+    split = _split_monthly(text)
+    if split is None:
+        return None
+    monthly, target = split
+    if monthly <= 0:
+        return None
+    rate, period = _percent(text)
+    rate = 0.0 if rate is None else _monthly_rate(rate, period)
+    months = int(savings_months(target, monthly, rate))
+    # savings_months ulaşılamayan hedeflerde MAX_MONTHS döner
+    if months >= MAX_MONTHS:
+        return None
+    years, rest = divmod(months, 12)
+    duration = f"{years} yıl {rest} ay" if years else f"{rest} ay"
+    return (
+        f"Aylık **{format_tl(monthly)}** birikimle ve aylık {format_percent(rate)} getiriyle "
+        f"**{format_tl(target)}** hedefine yaklaşık **{months} ayda** ({duration}) ulaşırsınız."
+    )
+
+
+def debt_intent(text):
+    if not _DEBT_RE.search(text) or not _asks_calculation(text, _DURATION_CUES, _DEBT_CUES):
+        return None
+    split = _split_monthly(text)
+    rate, period = _percent(text)
+    if split is None or rate is None:
+        return None
+    payment, balance = split
+    rate = _monthly_rate(rate, period)
+    months = float(debt_payoff_months(balance, payment, rate))
+    if not np.isfinite(months):
+        return (
+            f"Aylık **{format_tl(payment)}** ödeme, {format_tl(balance)} borcun aylık "
+            f"{format_percent(rate)} faizini ({format_tl(balance * rate)}) karşılamıyor; "
+            "bu ödemeyle borç kapanmaz. Ödemeyi artırmanızı öneririz."
+        )
+    interest = float(debt_total_interest(balance, payment, rate))
+    return (
+        f"**{format_tl(balance)}** borç, aylık {format_percent(rate)} faiz ve aylık "
+        f"**{format_tl(payment)}** ödemeyle **{int(months)} ayda** kapanır.\n\n"
+        f"- Toplam faiz: {format_tl(interest)}\n"
+        f"- Toplam ödeme: {format_tl(balance + interest)}"
+    )
+
+
+def loan_intent(text):
+    if not _LOAN_RE.search(text) or not _asks_calculation(text, _LOAN_CUES):
+        return None
+    amounts = _amounts(text)
+    months = _months(text)
+    rate, period = _percent(text)
+    if not amounts or months is None or rate is None:
+        return None
+    principal = amounts[0]
+    rate = _monthly_rate(rate, period)
+    payment = float(annuity_payment(principal, rate, months))
+    return (
+        f"**{format_tl(principal)}** kredi, aylık {format_percent(rate)} faiz ve **{months} ay** vadeyle:\n\n"
+        f"- Aylık taksit: **{format_tl(payment)}**\n"
+        f"- Toplam geri ödeme: {format_tl(payment * months)}\n"
+        f"- Toplam faiz: {format_tl(payment * months - principal)}\n\n"
+        "Vergi, fon ve masraflar hesaba dahil değildir."
+    )
+
+
+def _is_negation(a, b):
+    """İki kelimeden biri diğerine olumsuzluk eki eklenmiş hali mi"""
+    short, long = sorted((a, b), key=len)
+    if len(long) - len(short) != 2:
+        return False
+    return any(long[:i] + long[i + 2:] == short
+               for i in range(1, len(long) - 1) if long[i:i + 2] in NEGATION_INFIXES)
+
+
+def similar_question(a, b, ratio=FAQ_MATCH_RATIO):
+    """question_key ile normalize edilmiş iki soru yalnızca yazım farkıyla mı ayrışıyor.
+
+    Kelime sayıları aynı olmalı; farklı kelimeler az sayıda, tek tek
+    benzer ve birbirinin olumsuzu olmamalı.
+    """
+    words_a, words_b = a.split(), b.split()
+    if len(words_a) != len(words_b):
+        return False
+    differing = [(x, y) for x, y in zip(words_a, words_b) if x != y]
+    if len(differing) > max(1, int(len(words_a) * FAQ_MAX_TYPO_SHARE)):
+        return False
+    return all(
+        not _is_negation(x, y) and difflib.SequenceMatcher(None, x, y).ratio() >= ratio
+        for x, y in differing
+    )
+
+
+# Sıra önemli: "kredi kartı borcu" borç, "mevduat" soruları mevduat olarak yorumlanır
+CALCULATORS = (deposit_intent, debt_intent, savings_intent, loan_intent)
+
+
+class IntentRouter:
+    """Soruyu hesaplayıcıya veya kayıtlı SSS cevabına yönlendirir.
+
+    faq: {soru: cevap} sözlüğü; sorular question_key ile normalize edilir.
+    route(question) (cevap, tür) veya None döndürür; tür 'calculator' ya da 'faq'.
+    """
+
+    def __init__(self, faq=None, match_ratio=FAQ_MATCH_RATIO):
+        self.faq = {question_key(q): a for q, a in (faq or {}).items()}
+        self.match_ratio = match_ratio
+        self.counts = {'calculator': 0, 'faq': 0}
+        self._lock = threading.Lock()
+
+    def calculate(self, question):
+        text = normalize_tr(question)
+        if not re.search(r"\d", text):
+            return None
+        for intent in CALCULATORS:
+            try:
+                answer = intent(text)
+            except AmbiguousRate:
+                return None
+            except (ValueError, ZeroDivisionError):
+                answer = None
+            if answer is not None:
+                return answer + CALCULATOR_NOTE
+        return None
+
+    def lookup(self, question):
+        """Birebir veya yalnızca yazım farkı olan SSS sorusunun cevabı"""
+        key = question_key(question)
+        if key in self.faq:
+            return self.faq[key]
+        for faq_key, answer in self.faq.items():
+            if similar_question(key, faq_key, self.match_ratio):
+                return answer
+        return None
+
+    def match(self, question):
+        """Sayaçları değiştirmeden (cevap, tür) veya None döndürür"""
+        answer = self.calculate(question)
+        if answer is not None:
+            return answer, 'calculator'
+        answer = self.lookup(question)
+        if answer is not None:
+            return answer, 'faq'
+        return None
+
+    def route(self, question):
+        routed = self.match(question)
+        if routed is not None:
+            with self._lock:
+                self.counts[routed[1]] += 1
+        return routed
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counts, faq_size=len(self.faq))
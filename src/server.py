@@ -0,0 +1,301 @@
+"""FinancialChatbot için asyncio tabanlı HTTP sunucusu.
+
+Tek bir ısınmış süreç birçok Streamlit oturumuna (veya başka istemcilere)
+hizmet verir. Yalnızca standart kütüphane kullanılır.
+
+Uç noktalar:
+    GET  /health  -> {"status": "ok", "inflight": .., "queued": ..}
+    GET  /stats   -> FinancialChatbot.stats() + sunucu sayaçları
+    POST /ask     {"question": "...", "stream": false}
+                  -> {"answer": "..."}; stream=true ise düz metin, parça parça
+    POST /warm_up {"prompts": [...], "refresh_interval": null}
+                  -> sabit prompt'ların cevaplarını arka planda hesaplar
+
+Kapasite dolduğunda 503, süre aşımında 504 döner.
+
+Kullanım:
+    python server.py --port 8000 --max-llm 4 --queue-size 32 --timeout 30
+"""
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from rag_pipeline import FinancialChatbot
+
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 8000
+# Aynı anda LLM'e giden en fazla istek
+MAX_LLM_CONCURRENCY = 4
+# LLM slotu bekleyebilecek en fazla istek; fazlası 503 ile reddedilir
+QUEUE_SIZE = 32
+# İstek başına süre sınırı (sn); aşılırsa 504
+REQUEST_TIMEOUT = 30.0
+MAX_BODY_BYTES = 64 * 1024
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 413: 'Payload Too Large', 500: 'Internal Server Error',
+            503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ChatbotServer:
+    """FinancialChatbot'u sınırlı eşzamanlılık ve bekleme kuyruğuyla sunar.
+
+    Retrieval ve LLM çağrıları thread havuzunda çalışır; event loop yalnızca
+    bağlantıları yönetir. LLM çağrıları `max_llm` slotla sınırlanır, slot
+    bekleyen istekler kuyruktur. Kuyruk doluysa yeni istekler hemen 503 alır
+    (geri basınç); `timeout` saniyede biten istekler 504 alır.
+    """
+
+    def __init__(self, chatbot, max_llm=MAX_LLM_CONCURRENCY, queue_size=QUEUE_SIZE, timeout=REQUEST_TIMEOUT):
+        self.chatbot = chatbot
+        self.max_llm = max_llm
+        self.queue_size = queue_size
+        self.timeout = timeout
+        # Retrieval'ın LLM slotlarını beklerken aç kalmaması için ek thread'ler
+        self.executor = ThreadPoolExecutor(max_workers=max_llm + 4, thread_name_prefix='ask')
+        # Akışlar LLM slotunu kendi thread'lerinde bekler; ask havuzunu tıkamamaları
+        # için kabul edilebilecek en fazla istek kadar ayrı thread kullanırlar
+        self.stream_executor = ThreadPoolExecutor(max_workers=max_llm + queue_size, thread_name_prefix='stream')
+        self.llm_slots = asyncio.Semaphore(max_llm)
+        self.inflight = 0
+        self.counters = {'served': 0, 'rejected': 0, 'timeouts': 0, 'errors': 0}
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'inflight': self.inflight,
+            'queued': max(0, self.inflight - self.max_llm),
+            'capacity': self.max_llm + self.queue_size,
+        }
+
+    def stats(self):
+        stats = self.chatbot.stats()
+        stats['server'] = dict(self.counters, **self.health())
+        return stats
+
+    def _admit(self):
+        """Kapasite doluysa isteği reddeder, değilse sayacı artırır"""
+        if self.inflight >= self.max_llm + self.queue_size:
+            self.counters['rejected'] += 1
+            raise HttpError(503, "Sunucu şu anda yoğun, lütfen biraz sonra tekrar deneyin.")
+        self.inflight += 1
+
+    async def ask(self, question, filter=None):
+        """Soruyu kuyruk ve süre sınırıyla cevaplar"""
+        self._admit()
+        try:
+            answer = await asyncio.wait_for(
+                self.chatbot.ask_async(question, self.executor, self.llm_slots, filter), self.timeout
+            )
+            self.counters['served'] += 1
+            return answer
+        except asyncio.TimeoutError:
+            self.counters['timeouts'] += 1
+            raise HttpError(504, f"Cevap {self.timeout:.0f} sn içinde üretilemedi.")
+        finally:
+            self.inflight -= 1
+
+    async def ask_stream(self, question, send, filter=None):
+        """Cevap parçalarını `send` ile iletir.
+
+        ask_stream generator'ı ayrı bir thread havuzunda çalışır. LLM slotu,
+        ask'teki gibi yalnızca soru gerçekten LLM'e gittiğinde ve akış
+        süresince tutulur. Süre sınırı ilk parçaya uygulanır (başlıklar ondan
+        sonra gönderilir), sonrası akış hızında ilerler.
+        """
+        self._admit()
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+        abandoned = False
+
+        async def acquire():
+            await self.llm_slots.acquire()
+            if abandoned:
+                # İstek slot beklerken sonlandı; üretici LLM'e gitmez
+                self.llm_slots.release()
+                raise asyncio.CancelledError()
+
+        @contextmanager
+        def llm_slot():
+            asyncio.run_coroutine_threadsafe(acquire(), loop).result()
+            try:
+                yield
+            finally:
+                loop.call_soon_threadsafe(self.llm_slots.release)
+
+        def produce():
+            try:
+                for chunk in self.chatbot.ask_stream(question, filter, llm_slot):
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, None)
+
+        try:
+            loop.run_in_executor(self.stream_executor, produce)
+            try:
+                chunk = await asyncio.wait_for(chunks.get(), self.timeout)
+            except asyncio.TimeoutError:
+                self.counters['timeouts'] += 1
+                raise HttpError(504, f"Cevap {self.timeout:.0f} sn içinde üretilemedi.")
+            while chunk is not None:
+                await send(chunk)
+                chunk = await chunks.get()
+            self.counters['served'] += 1
+        finally:
+            abandoned = True
+            self.inflight -= 1
+
+    async def handle(self, reader, writer):
+        """Tek bir HTTP/1.1 isteğini okur, cevaplar ve bağlantıyı kapatır"""
+        started = time.perf_counter()
+        headers_sent = False
+        try:
+            method, path, body = await self._read_request(reader)
+            if method == 'GET' and path == '/health':
+                await self._send_json(writer, 200, self.health())
+            elif method == 'GET' and path == '/stats':
+                await self._send_json(writer, 200, self.stats())
+            elif method == 'POST' and path == '/ask':
+                payload = self._payload(body)
+                question = payload.get('question') or ''
+                if not isinstance(question, str) or not question.strip():
+                    raise HttpError(400, "question alanı boş olmayan bir metin olmalı")
+                question = question.strip()
+                filter = payload.get('filter')
+                try:
+                    self.chatbot.validate_filter(filter)
+                except ValueError as e:
+                    raise HttpError(400, f"Geçersiz filter: {e}")
+                if payload.get('stream'):
+                    async def send(chunk):
+                        nonlocal headers_sent
+                        if not headers_sent:
+                            writer.write(self._head(200, 'text/plain; charset=utf-8', chunked=True))
+                            headers_sent = True
+                        data = chunk.encode('utf-8')
+                        if data:
+                            writer.write(b'%x\r\n%s\r\n' % (len(data), data))
+                            await writer.drain()
+
+                    await self.ask_stream(question, send, filter)
+                    if not headers_sent:
+                        await send('')
+                    writer.write(b'0\r\n\r\n')
+                else:
+                    answer = await self.ask(question, filter)
+                    await self._send_json(writer, 200, {'answer': answer})
+            elif method == 'POST' and path == '/warm_up':
+                payload = self._payload(body)
+                prompts = payload.get('prompts') or []
+                if not isinstance(prompts, list) or not all(isinstance(p, str) for p in prompts):
+                    raise HttpError(400, "prompts alanı metin listesi olmalı")
+                self.chatbot.warm_up(prompts, payload.get('refresh_interval'))
+                await self._send_json(writer, 200, {'status': 'started'})
+            else:
+                raise HttpError(404, f"{method} {path} bulunamadı")
+        except HttpError as e:
+            if not headers_sent:
+                await self._send_json(writer, e.status, {'error': str(e)})
+        except (ValueError, UnicodeDecodeError) as e:
+            if not headers_sent:
+                await self._send_json(writer, 400, {'error': f"Geçersiz istek: {e}"})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            self.counters['errors'] += 1
+            print(f" İstek işlenemedi ({time.perf_counter() - started:.2f} sn): {e}")
+            if not headers_sent:
+                await self._send_json(writer, 500, {'error': str(e)})
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _read_request(reader):
+        request_line = (await reader.readline()).decode('latin-1').split()
+        if len(request_line) != 3:
+            raise HttpError(400, "Geçersiz istek satırı")
+        method, path, _ = request_line
+        length = 0
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length':
+                length = int(value)
+        if length > MAX_BODY_BYTES:
+            raise HttpError(413, "İstek gövdesi çok büyük")
+        body = await reader.readexactly(length) if length else b''
+        return method, path.split('?')[0], body
+
+    @staticmethod
+    def _payload(body):
+        """İstek gövdesini JSON nesnesi olarak çözer; nesne değilse 400"""
+        payload = json.loads(body or b'{}')
+        if not isinstance(payload, dict):
+            raise HttpError(400, "İstek gövdesi bir JSON nesnesi olmalı")
+        return payload
+
+    @staticmethod
+    def _head(status, content_type, length=None, chunked=False):
+        lines = [f"HTTP/1.1 {status} {_REASONS.get(status, 'Error')}", f"Content-Type: {content_type}",
+                 "Connection: close"]
+        if chunked:
+            lines.append("Transfer-Encoding: chunked")
+        else:
+            lines.append(f"Content-Length: {length}")
+        if status == 503:
+            lines.append("Retry-After: 1")
+        return ("\r\n".join(lines) + "\r\n\r\n").encode('latin-1')
+
+    async def _send_json(self, writer, status, payload):
+        data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(self._head(status, 'application/json; charset=utf-8', len(data)) + data)
+        await writer.drain()
+
+
+async def serve(chatbot, host=SERVER_HOST, port=SERVER_PORT, **kwargs):
+    app = ChatbotServer(chatbot, **kwargs)
+    server = await asyncio.start_server(app.handle, host, port)
+    print(f" Sunucu http://{host}:{port} adresinde dinliyor "
+          f"(LLM eşzamanlılığı {app.max_llm}, kuyruk {app.queue_size}, zaman aşımı {app.timeout:.0f} sn)")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FinancialChatbot HTTP sunucusu")
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--data', default='data/all_qa_data.json')
+    parser.add_argument('--max-llm', type=int, default=MAX_LLM_CONCURRENCY, help="Eşzamanlı LLM çağrısı sınırı")
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help="Slot bekleyebilecek istek sayısı")
+    parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, help="İstek başına süre sınırı (sn)")
+    args = parser.parse_args()
+
+    # Model ve index sunucu açılmadan yüklenir; ilk istek ısınmış süreçe gelir
+    chatbot = FinancialChatbot(data_path=args.data)
+    try:
+        asyncio.run(serve(chatbot, args.host, args.port, max_llm=args.max_llm,
+                          queue_size=args.queue_size, timeout=args.timeout))
+    except KeyboardInterrupt:
+        print("\n Sunucu durduruldu")
+
+
+if __name__ == "__main__":
+    main()
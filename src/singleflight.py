@@ -0,0 +1,69 @@
+import re
+import threading
+from concurrent.futures import Future
+
+from lexical import normalize_tr
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def question_key(question):
+    """Büyük/küçük harf, Türkçe karakter, noktalama ve boşluk farklarını yok sayan anahtar"""
+    return " ".join(_WORD_RE.findall(normalize_tr(question)))
+
+
+class SingleFlight:
+    """Aynı anahtarla eşzamanlı gelen çağrıları tek bir hesaplamada birleştirir.
+
+    İlk çağıran (lider) hesaplamayı yapar; o sürerken aynı anahtarla gelenler
+    liderin Future'ını bekler ve aynı sonucu alır. Hesaplama bitince anahtar
+    silinir, yani sonuçlar önbelleğe alınmaz. Streamlit oturum thread'leri
+    ve asyncio (asyncio.wrap_future ile) birlikte kullanılabilir.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.coalesced = 0
+
+    def begin(self, key):
+        """(future, lider_mi) döndürür; lider işi bitirince `finish` çağırmalıdır"""
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            # RUNNING durumundaki Future bekleyenlerden biri tarafından iptal edilemez
+            future.set_running_or_notify_cancel()
+            self._calls[key] = future
+            return future, True
+
+    def finish(self, key, future, result=None, error=None):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def do(self, key, fn, *args):
+        """fn(*args) sonucunu döndürür; aynı anahtarla süren bir çağrı varsa onu bekler"""
+        future, leader = self.begin(key)
+        if not leader:
+            return future.result()
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            self.finish(key, future, error=e)
+            raise
+        self.finish(key, future, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            inflight = len(self._calls)
+        return {'calls': self.calls, 'coalesced': self.coalesced, 'inflight': inflight}
@@ -0,0 +1,83 @@
+import threading
+import time
+
+# hızlı başlangıç çipleri (evaluate.py de yönlendirme kontrolü için kullanır)
+QUICK_START_PROMPTS = [
+    "Aylık bütçeyi nasıl planlarım?",
+    "Kredi kartı borcunu azaltmanın yolları?",
+    "Acil durum fonu için hedef ne olmalı?",
+    "Vadeli mevduat ile fon farkı nedir?"
+]
+
+
+class PrecomputedAnswers:
+    """Sabit prompt'lar (hızlı başlangıç çipleri, Öğren sekmesi) için önceden
+    üretilmiş cevaplar.
+
+    Cevaplar `ttl` saniye geçerlidir. `start` ile verilen prompt'lar arka planda
+    hesaplanır ve `refresh_interval` verilmişse periyodik olarak yenilenir;
+    böylece tıklamalar LLM'i beklemeden anında cevaplanır.
+    """
+
+    def __init__(self, ttl=6 * 3600):
+        self.ttl = ttl
+        self.hits = 0
+        self._answers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    @staticmethod
+    def _key(prompt):
+        return " ".join(prompt.split())
+
+    def get(self, prompt):
+        """Geçerli bir önceden hesaplanmış cevap varsa döndürür"""
+        with self._lock:
+            entry = self._answers.get(self._key(prompt))
+            if entry is None or time.time() - entry[1] > self.ttl:
+                return None
+            self.hits += 1
+            return entry[0]
+
+    def put(self, prompt, answer):
+        with self._lock:
+            self._answers[self._key(prompt)] = (answer, time.time())
+
+    def warm(self, compute, prompts):
+        """Her prompt için cevabı hesaplar; hata veren prompt'lar atlanır"""
+        start = time.perf_counter()
+        done = 0
+        for prompt in prompts:
+            if self._stop.is_set():
+                break
+            try:
+                self.put(prompt, compute(prompt))
+                done += 1
+            except Exception as e:
+                print(f" Ön hesaplama başarısız ({prompt[:40]}...): {e}")
+        print(f" {done}/{len(prompts)} hazır cevap hesaplandı ({time.perf_counter() - start:.1f} sn)")
+
+    def start(self, compute, prompts, refresh_interval=None):
+        """Prompt'ları arka planda hesaplar; refresh_interval saniyede bir yeniler"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        def run():
+            while True:
+                self.warm(compute, prompts)
+                if refresh_interval is None or self._stop.wait(refresh_interval):
+                    break
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=run, name="answer-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            fresh = sum(1 for _, created in self._answers.values() if now - created <= self.ttl)
+        return {'hits': self.hits, 'size': fresh}